@@ -1,258 +1,1181 @@
-import os
-import shutil
-import json
-import logging
-from datetime import datetime
-import requests
-import subprocess
-import sys
-import re
-
-# Настройка кодировки для логирования и файловых операций
-sys.stdout.reconfigure(encoding='utf-8')
-sys.stderr.reconfigure(encoding='utf-8')
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("organize_projects.log", encoding='utf-8'),  # Логи записываются в файл с кодировкой UTF-8
-        logging.StreamHandler(),  # Логи выводятся в консоль
-    ],
-)
-
-# Конфигурационный файл
-CONFIG_FILE = "config.json"
-
-# GitHub API
-GITHUB_API_URL = "https://api.github.com"
-GITHUB_TOKEN = "ваш_токен_github"  # Замените на ваш GitHub токен
-GITHUB_USERNAME = "ваш_username_github"  # Замените на ваш GitHub username
-
-# Список необходимых библиотек
-REQUIRED_LIBRARIES = ["requests"]
-
-def sanitize_project_name(project_name):
-    """
-    Очищает имя проекта от недопустимых символов для создания репозитория на GitHub.
-    Заменяет пробелы и специальные символы на дефисы.
-    """
-    # Удаляем все символы, кроме букв, цифр, дефисов и подчеркиваний
-    sanitized_name = re.sub(r'[^a-zA-Z0-9-_]', '-', project_name)
-    # Убираем множественные дефисы
-    sanitized_name = re.sub(r'-+', '-', sanitized_name)
-    # Убираем дефисы в начале и конце
-    sanitized_name = sanitized_name.strip('-')
-    return sanitized_name
-
-def install_dependencies():
-    """
-    Проверяет и устанавливает необходимые библиотеки, если они отсутствуют.
-    """
-    for library in REQUIRED_LIBRARIES:
-        try:
-            __import__(library)
-            logging.info(f"Библиотека {library} уже установлена.")
-        except ImportError:
-            logging.warning(f"Библиотека {library} не найдена. Устанавливаем...")
-            try:
-                subprocess.check_call([sys.executable, "-m", "pip", "install", library])
-                logging.info(f"Библиотека {library} успешно установлена.")
-            except subprocess.CalledProcessError as e:
-                logging.error(f"Ошибка при установке библиотеки {library}: {e}")
-                sys.exit(1)
-
-def load_config():
-    """
-    Загружает конфигурацию из файла config.json.
-    Если файл отсутствует, возвращает пустой словарь.
-    """
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "r", encoding='utf-8') as f:
-            return json.load(f)
-    return {"projects": {}}
-
-def save_config(config):
-    """
-    Сохраняет конфигурацию в файл config.json.
-    """
-    with open(CONFIG_FILE, "w", encoding='utf-8') as f:
-        json.dump(config, f, indent=4, ensure_ascii=False)
-
-def create_project_structure(base_path, project_name):
-    """
-    Создает структуру директорий для проекта:
-    - scripts/ для скриптов
-    - data/ для данных
-    - README.md с описанием проекта
-    """
-    try:
-        os.makedirs(os.path.join(base_path, project_name, "scripts"), exist_ok=True)
-        os.makedirs(os.path.join(base_path, project_name, "data"), exist_ok=True)
-        with open(os.path.join(base_path, project_name, "README.md"), "w", encoding='utf-8') as readme:
-            readme.write(f"# {project_name}\n\nОписание проекта.")
-        logging.info(f"Структура проекта {project_name} создана.")
-    except Exception as e:
-        logging.error(f"Ошибка при создании структуры проекта: {e}")
-
-def backup_file(file_path, backup_dir):
-    """
-    Создает резервную копию файла в папке Backup.
-    """
-    try:
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir)
-        shutil.copy2(file_path, backup_dir)
-        logging.info(f"Резервная копия файла {os.path.basename(file_path)} создана в {backup_dir}.")
-    except Exception as e:
-        logging.error(f"Ошибка при создании резервной копии файла {file_path}: {e}")
-
-def check_github_repo_exists(repo_name):
-    """
-    Проверяет, существует ли репозиторий на GitHub.
-    Возвращает True, если репозиторий существует, иначе False.
-    """
-    url = f"{GITHUB_API_URL}/repos/{GITHUB_USERNAME}/{repo_name}"
-    headers = {
-        "Authorization": f"token {GITHUB_TOKEN}".encode('ascii').decode('latin-1'),
-        "Accept": "application/vnd.github.v3+json",
-    }
-    try:
-        response = requests.get(url, headers=headers)
-        return response.status_code == 200
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Ошибка при проверке репозитория на GitHub: {e}")
-        return False
-
-def create_github_repo(repo_name):
-    """
-    Создает новый репозиторий на GitHub.
-    Возвращает True, если репозиторий успешно создан, иначе False.
-    """
-    url = f"{GITHUB_API_URL}/user/repos"
-    headers = {
-        "Authorization": f"token {GITHUB_TOKEN}".encode('ascii').decode('latin-1'),
-        "Accept": "application/vnd.github.v3+json",
-    }
-    data = {
-        "name": repo_name,
-        "private": False,  # Можете изменить на True, если нужен приватный репозиторий
-        "auto_init": False,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code == 201:
-            logging.info(f"Репозиторий {repo_name} создан на GitHub.")
-            return True
-        else:
-            logging.error(f"Ошибка при создании репозитория: {response.json()}")
-            return False
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Ошибка при создании репозитория: {e}")
-        return False
-
-def init_git_repo(project_path, repo_name):
-    """
-    Инициализирует Git в локальной папке проекта и привязывает её к удаленному репозиторию на GitHub.
-    """
-    try:
-        # Переходим в папку проекта
-        os.chdir(project_path)
-        
-        # Инициализация Git
-        os.system("git init")
-        os.system("git add .")
-        os.system('git commit -m "Initial commit"')
-        
-        # Привязка к удаленному репозиторию
-        os.system(f"git remote add origin https://github.com/{GITHUB_USERNAME}/{repo_name}.git")
-        os.system("git branch -M main")
-        os.system("git push -u origin main")
-        
-        logging.info(f"Git репозиторий для проекта {repo_name} инициализирован и привязан к GitHub.")
-    except Exception as e:
-        logging.error(f"Ошибка при инициализации Git: {e}")
-
-def organize_scripts(base_path, config):
-    """
-    Организует файлы в папке base_path:
-    - Создает структуру для каждого проекта.
-    - Перемещает файлы в соответствующие папки (scripts или data).
-    - Создает резервные копии файлов.
-    - Проверяет и создает репозитории на GitHub.
-    """
-    backup_dir = os.path.join(base_path, "Backup")
-    for item in os.listdir(base_path):
-        item_path = os.path.join(base_path, item)
-        
-        # Пропускаем директории (уже организованные проекты и папку Backup)
-        if os.path.isdir(item_path) or item == "Backup":
-            continue
-        
-        # Определяем имя проекта (например, по имени файла)
-        project_name = os.path.splitext(item)[0]
-        project_path = os.path.join(base_path, project_name)
-        
-        # Очищаем имя проекта для GitHub
-        sanitized_project_name = sanitize_project_name(project_name)
-        
-        # Создаем структуру проекта, если она еще не существует
-        if project_name not in config["projects"]:
-            create_project_structure(base_path, project_name)
-            config["projects"][project_name] = {
-                "created_at": datetime.now().isoformat(),
-                "files": [],
-            }
-        
-        # Создаем резервную копию файла
-        backup_file(item_path, backup_dir)
-        
-        # Определяем тип файла и перемещаем его в соответствующую директорию
-        try:
-            if item.endswith((".py", ".sh")):
-                shutil.move(item_path, os.path.join(project_path, "scripts", item))
-                config["projects"][project_name]["files"].append({"name": item, "type": "script", "moved_at": datetime.now().isoformat()})
-                logging.info(f"Файл {item} перемещен в папку scripts проекта {project_name}.")
-            elif item.endswith((".csv", ".json", ".xlsx", ".db")):
-                shutil.move(item_path, os.path.join(project_path, "data", item))
-                config["projects"][project_name]["files"].append({"name": item, "type": "data", "moved_at": datetime.now().isoformat()})
-                logging.info(f"Файл {item} перемещен в папку data проекта {project_name}.")
-            else:
-                logging.warning(f"Файл {item} не был перемещен, так как его тип не определен.")
-        except Exception as e:
-            logging.error(f"Ошибка при перемещении файла {item}: {e}")
-        
-        # Проверяем и создаем репозиторий на GitHub
-        if not check_github_repo_exists(sanitized_project_name):
-            if create_github_repo(sanitized_project_name):
-                init_git_repo(project_path, sanitized_project_name)
-        else:
-            logging.info(f"Репозиторий {sanitized_project_name} уже существует на GitHub.")
-
-def main():
-    """
-    Основная функция скрипта.
-    """
-    # Устанавливаем зависимости при первом запуске
-    install_dependencies()
-    
-    # Укажите путь к папке с вашими скриптами и проектами
-    scripts_folder = input("Введите путь к папке с вашими скриптами и проектами: ")
-    
-    if not os.path.exists(scripts_folder):
-        print(f"Папка {scripts_folder} не существует.")
-        return
-    
-    # Загружаем конфигурацию
-    config = load_config()
-    
-    # Организуем файлы в папке
-    organize_scripts(scripts_folder, config)
-    
-    # Сохраняем обновленную конфигурацию
-    save_config(config)
-    print("Организация проектов завершена.")
-
-if __name__ == "__main__":
+import os
+import errno
+import fnmatch
+import shutil
+import hashlib
+import json
+import logging
+import argparse
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import subprocess
+import sys
+import re
+
+try:
+    import fcntl  # Есть только в Unix; нужен для reflink-копий
+except ImportError:
+    fcntl = None
+
+# Настройка кодировки для логирования и файловых операций
+sys.stdout.reconfigure(encoding='utf-8')
+sys.stderr.reconfigure(encoding='utf-8')
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+    handlers=[
+        logging.FileHandler("organize_projects.log", encoding='utf-8'),  # Логи записываются в файл с кодировкой UTF-8
+        logging.StreamHandler(),  # Логи выводятся в консоль
+    ],
+)
+
+# Конфигурационный файл прежних версий (переносится в базу состояния при первом запуске)
+CONFIG_FILE = "config.json"
+# База состояния: проекты, перемещения, резервные копии и репозитории
+STATE_FILE = "organizer_state.db"
+
+# GitHub API (адрес можно подменить переменной окружения, например на локальный сервер-заглушку)
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+GITHUB_TOKEN = "ваш_токен_github"  # Замените на ваш GitHub токен
+GITHUB_USERNAME = "ваш_username_github"  # Замените на ваш GitHub username
+
+# Параметры клиента GitHub
+GITHUB_TIMEOUT = (5, 30)  # Таймауты подключения и чтения, секунды
+GITHUB_MAX_WORKERS = 4  # Сколько репозиториев создаём одновременно
+GITHUB_MAX_RETRIES = 5  # Повторы запроса при ограничении частоты и ошибках сервера
+GITHUB_BACKOFF = 1.0  # Начальная пауза между повторами, секунды
+GITHUB_MAX_WAIT = 900  # Дольше этого не ждём сброса лимита, секунды
+
+# Параметры Git
+GIT_REMOTE_TEMPLATE = "https://github.com/{username}/{repo}.git"
+GIT_MAX_WORKERS = 4  # Сколько проектов инициализируем и отправляем одновременно
+GIT_TIMEOUT = 300  # Предел на одну команду git, секунды
+
+# Параметры резервного копирования
+BACKUP_CHUNK_SIZE = 1024 * 1024  # Файлы хэшируются и копируются блоками по 1 МиБ
+BACKUP_MANIFEST = "manifest.db"
+FICLONE = 0x40049409  # ioctl Linux для reflink-копии (btrfs, xfs)
+
+# Параметры обхода папки
+ORGANIZE_MAX_WORKERS = 8  # Сколько файлов копируем и перемещаем одновременно
+# Что не трогаем при обходе: папку копий, служебные папки и собственные файлы организатора
+DEFAULT_IGNORE_PATTERNS = ("Backup", ".git", "__pycache__", CONFIG_FILE, f"{STATE_FILE}*", "organize_projects.log")
+MAGIC_BYTES = 16  # Сколько первых байт файла читаем для проверки сигнатур
+
+# Правила определения типа файла: сначала по расширению, затем (если расширение не подошло)
+# по сигнатуре в начале файла. Дополняются через register_file_rule.
+# Файл без расширения на верхнем уровне занимает место папки своего проекта - его
+# organize_scripts перед созданием папки временно переименовывает (см. plan_organization).
+FILE_RULES = [
+    {"type": "script", "extensions": (".py", ".sh"), "magic": (b"#!",)},
+    {"type": "data", "extensions": (".csv", ".json", ".xlsx", ".db"), "magic": (b"SQLite format 3\x00",)},
+]
+# Папка проекта для каждого типа файла
+FILE_TYPE_FOLDERS = {"script": "scripts", "data": "data"}
+
+# Грубая оценка стоимости для пробного запуска
+ESTIMATE_DISK_MB_PER_S = 150  # Чтение для хэша и запись копий
+ESTIMATE_FILE_OVERHEAD_S = 0.002  # Открытие, stat, запись в базу на один файл
+ESTIMATE_REPO_S = 3.0  # Создание репозитория и push одного проекта
+
+# Список необходимых библиотек
+REQUIRED_LIBRARIES = ["requests"]
+
+def sanitize_project_name(project_name):
+    """
+    Очищает имя проекта от недопустимых символов для создания репозитория на GitHub.
+    Заменяет пробелы и специальные символы на дефисы.
+    """
+    # Удаляем все символы, кроме букв, цифр, дефисов и подчеркиваний
+    sanitized_name = re.sub(r'[^a-zA-Z0-9-_]', '-', project_name)
+    # Убираем множественные дефисы
+    sanitized_name = re.sub(r'-+', '-', sanitized_name)
+    # Убираем дефисы в начале и конце
+    sanitized_name = sanitized_name.strip('-')
+    return sanitized_name
+
+def install_dependencies():
+    """
+    Проверяет и устанавливает необходимые библиотеки, если они отсутствуют.
+    """
+    for library in REQUIRED_LIBRARIES:
+        try:
+            __import__(library)
+            logging.info(f"Библиотека {library} уже установлена.")
+        except ImportError:
+            logging.warning(f"Библиотека {library} не найдена. Устанавливаем...")
+            try:
+                subprocess.check_call([sys.executable, "-m", "pip", "install", library])
+                logging.info(f"Библиотека {library} успешно установлена.")
+            except subprocess.CalledProcessError as e:
+                logging.error(f"Ошибка при установке библиотеки {library}: {e}")
+                sys.exit(1)
+
+class ProjectState:
+    """
+    Состояние организатора в SQLite вместо config.json.
+    Каждое действие (новый проект, перемещение, резервная копия, репозиторий, push)
+    записывается сразу отдельной транзакцией, поэтому после сбоя работа продолжается
+    с того же места. Проверка "известен ли проект" - поиск по первичному ключу,
+    без загрузки всей истории.
+    Статус репозитория: NULL - ещё не обработан, exists - уже был на GitHub,
+    created - создан, но Git не отправлен, pushed - всё готово.
+    При readonly=True база копируется в память (файл открывается только на чтение
+    и не создается, если его нет): так пробный запуск ничего не меняет на диске.
+    """
+
+    def __init__(self, path=STATE_FILE, readonly=False):
+        self._lock = threading.Lock()
+        if readonly:
+            self.conn = sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False)
+            if os.path.exists(path):
+                # Без журнала WAL база читается как неизменяемая: mode=ro оставил бы пустые -wal и -shm
+                mode = "mode=ro" if os.path.exists(f"{path}-wal") else "immutable=1"
+                source = sqlite3.connect(f"file:{path}?{mode}", uri=True)
+                try:
+                    source.backup(self.conn)
+                finally:
+                    source.close()
+        else:
+            self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+        CREATE TABLE IF NOT EXISTS projects (
+            name TEXT PRIMARY KEY,
+            path TEXT,
+            repo_name TEXT,
+            repo_status TEXT,
+            created_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_projects_repo ON projects(repo_name);
+        CREATE INDEX IF NOT EXISTS idx_projects_pending ON projects(repo_status)
+            WHERE repo_status IS NULL OR repo_status = 'created';
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project TEXT,
+            kind TEXT NOT NULL,
+            file_name TEXT,
+            file_type TEXT,
+            source TEXT,
+            target TEXT,
+            at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_project ON events(project);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params)
+
+    def has_project(self, name):
+        return self._execute("SELECT 1 FROM projects WHERE name = ?", (name,)).fetchone() is not None
+
+    def add_project(self, name, path, repo_name):
+        """
+        Регистрирует проект. Возвращает True, если проект новый.
+        """
+        cursor = self._execute(
+            "INSERT OR IGNORE INTO projects (name, path, repo_name, created_at) VALUES (?, ?, ?, ?)",
+            (name, path, repo_name, datetime.now().isoformat()))
+        if cursor.rowcount:
+            return True
+        # Проекты из config.json не знали своей папки - дополняем
+        self._execute("UPDATE projects SET path = COALESCE(path, ?), repo_name = COALESCE(repo_name, ?) WHERE name = ?",
+                      (path, repo_name, name))
+        return False
+
+    def record_event(self, project, kind, file_name=None, file_type=None, source=None, target=None):
+        self._execute(
+            "INSERT INTO events (project, kind, file_name, file_type, source, target, at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (project, kind, file_name, file_type, source, target, datetime.now().isoformat()))
+
+    def record_move(self, project, file_name, file_type, source, target):
+        self.record_event(project, "move", file_name, file_type, source, target)
+
+    def record_backup(self, project, file_name, source, target):
+        self.record_event(project, "backup", file_name, None, source, target)
+
+    def set_repo_status(self, repo_name, status):
+        self._execute("UPDATE projects SET repo_status = ? WHERE repo_name = ?", (status, repo_name))
+        self.record_event(None, f"repo_{status}", target=repo_name)
+
+    def pending_repos(self):
+        """
+        Проекты, для которых репозиторий ещё не создан или Git не отправлен:
+        {имя репозитория: путь к папке проекта}.
+        """
+        rows = self._execute(
+            "SELECT repo_name, path FROM projects "
+            "WHERE (repo_status IS NULL OR repo_status = 'created') AND path IS NOT NULL AND repo_name IS NOT NULL "
+            "ORDER BY created_at").fetchall()
+        pending = {}
+        for repo_name, path in rows:
+            pending.setdefault(repo_name, path)
+        return pending
+
+    def created_repos(self):
+        """
+        Репозитории, созданные на GitHub, но ещё не получившие push.
+        """
+        rows = self._execute("SELECT DISTINCT repo_name FROM projects WHERE repo_status = 'created'")
+        return {repo_name for repo_name, in rows}
+
+    def project_files(self, name):
+        """
+        Перемещенные файлы проекта: [{"name", "type", "moved_at"}, ...].
+        """
+        rows = self._execute(
+            "SELECT file_name, file_type, at FROM events WHERE project = ? AND kind = 'move' ORDER BY id", (name,))
+        return [{"name": file_name, "type": file_type, "moved_at": at} for file_name, file_type, at in rows]
+
+    def import_config(self, config_file=CONFIG_FILE):
+        """
+        Однократно переносит проекты и историю файлов из config.json.
+        Такие проекты уже обрабатывались прежней версией, поэтому их репозитории считаются готовыми.
+        """
+        if self._execute("SELECT 1 FROM meta WHERE key = 'config_imported'").fetchone() or not os.path.exists(config_file):
+            return 0
+        with open(config_file, "r", encoding='utf-8') as f:
+            projects = json.load(f).get("projects", {})
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            for name, project in projects.items():
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO projects (name, repo_name, repo_status, created_at) VALUES (?, ?, 'exists', ?)",
+                    (name, sanitize_project_name(name), project.get("created_at") or datetime.now().isoformat()))
+                self.conn.executemany(
+                    "INSERT INTO events (project, kind, file_name, file_type, at) VALUES (?, 'move', ?, ?, ?)",
+                    ((name, f.get("name"), f.get("type"), f.get("moved_at") or "") for f in project.get("files", [])))
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('config_imported', ?)", (datetime.now().isoformat(),))
+        logging.info(f"Перенесено проектов из {config_file}: {len(projects)}.")
+        return len(projects)
+
+def create_project_structure(base_path, project_name):
+    """
+    Создает структуру директорий для проекта:
+    - scripts/ для скриптов
+    - data/ для данных
+    - README.md с описанием проекта
+    """
+    try:
+        os.makedirs(os.path.join(base_path, project_name, "scripts"), exist_ok=True)
+        os.makedirs(os.path.join(base_path, project_name, "data"), exist_ok=True)
+        with open(os.path.join(base_path, project_name, "README.md"), "w", encoding='utf-8') as readme:
+            readme.write(f"# {project_name}\n\nОписание проекта.")
+        logging.info(f"Структура проекта {project_name} создана.")
+    except Exception as e:
+        logging.error(f"Ошибка при создании структуры проекта: {e}")
+
+def _file_sha256(path):
+    """
+    SHA-256 файла, читаемого блоками в один и тот же буфер.
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray(BACKUP_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+def _place_blob(source, target, allow_hardlink=False):
+    """
+    Помещает содержимое source в новый файл target самым дешевым доступным способом.
+    Возвращает название способа.
+    Жесткая ссылка разделяет файл с оригиналом, и его последующая правка испортит
+    резервную копию, поэтому она используется только по явному разрешению.
+    """
+    if allow_hardlink:
+        try:
+            os.link(source, target)
+            return "hardlink"
+        except OSError:
+            pass
+
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                return "reflink"
+            except OSError:
+                pass
+        if hasattr(os, "copy_file_range"):
+            try:
+                size = os.fstat(src.fileno()).st_size
+                copied = 0
+                while copied < size:
+                    step = os.copy_file_range(src.fileno(), dst.fileno(), min(size - copied, 1 << 30))
+                    if step == 0:
+                        break
+                    copied += step
+                if copied == size:
+                    return "copy_file_range"
+            except OSError:
+                pass
+            src.seek(0)
+            dst.seek(0)
+            dst.truncate()
+        shutil.copyfileobj(src, dst, BACKUP_CHUNK_SIZE)
+        return "copy"
+
+class BackupStore:
+    """
+    Хранилище резервных копий с адресацией по содержимому.
+    Каждое уникальное содержимое хранится один раз в objects/<2 символа>/<sha256>;
+    manifest.db связывает исходные пути и время изменения файлов с копиями.
+    Неизмененный файл (тот же путь, размер и mtime) повторно не читается.
+    """
+
+    def __init__(self, backup_dir, allow_hardlink=False):
+        self.backup_dir = backup_dir
+        self.objects_dir = os.path.join(backup_dir, "objects")
+        self.allow_hardlink = allow_hardlink
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(backup_dir, BACKUP_MANIFEST), isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            method TEXT NOT NULL,
+            stored_at TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS manifest (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sha256 TEXT NOT NULL REFERENCES blobs(sha256),
+            backed_up_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_manifest_path ON manifest(path, size, mtime_ns);
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def blob_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def backup(self, file_path):
+        """
+        Сохраняет файл в хранилище. Возвращает (путь к копии, способ), где способ -
+        unchanged (файл не менялся), dedup (такое содержимое уже есть) или способ копирования.
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT sha256 FROM manifest WHERE path = ? AND size = ? AND mtime_ns = ? ORDER BY id DESC LIMIT 1",
+                (path, stat.st_size, stat.st_mtime_ns)).fetchone()
+        if row and os.path.exists(self.blob_path(row[0])):
+            return self.blob_path(row[0]), "unchanged"
+
+        sha256 = _file_sha256(path)
+        blob = self.blob_path(sha256)
+        if os.path.exists(blob):
+            method = "dedup"
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            # Сначала во временный файл, затем атомарное переименование: параллельные копии
+            # одного содержимого не портят друг друга, а оборванная копия не выглядит готовой
+            temp = f"{blob}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                method = _place_blob(path, temp, self.allow_hardlink)
+                if method != "hardlink":
+                    shutil.copystat(path, temp)
+                    os.chmod(temp, 0o444)
+                os.replace(temp, blob)
+            except BaseException:
+                if os.path.exists(temp):
+                    os.remove(temp)
+                raise
+
+        now = datetime.now().isoformat()
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute("INSERT OR IGNORE INTO blobs (sha256, size, method, stored_at) VALUES (?, ?, ?, ?)",
+                              (sha256, stat.st_size, method, now))
+            self.conn.execute("INSERT INTO manifest (path, size, mtime_ns, sha256, backed_up_at) VALUES (?, ?, ?, ?, ?)",
+                              (path, stat.st_size, stat.st_mtime_ns, sha256, now))
+        return blob, method
+
+    def history(self, file_path):
+        """
+        Все сохраненные версии файла: [(mtime_ns, sha256, путь к копии), ...], от старых к новым.
+        """
+        with self._lock:
+            rows = self.conn.execute("SELECT mtime_ns, sha256 FROM manifest WHERE path = ? ORDER BY id",
+                                     (os.path.abspath(file_path),)).fetchall()
+        return [(mtime_ns, sha256, self.blob_path(sha256)) for mtime_ns, sha256 in rows]
+
+    def stats(self):
+        """
+        Возвращает (число уникальных копий, их общий размер в байтах).
+        """
+        with self._lock:
+            count, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return count, size
+
+_backup_stores = {}
+_backup_stores_lock = threading.Lock()
+
+def get_backup_store(backup_dir):
+    """
+    Возвращает открытое хранилище резервных копий для папки (одно на папку за запуск).
+    """
+    key = os.path.abspath(backup_dir)
+    with _backup_stores_lock:
+        if key not in _backup_stores:
+            _backup_stores[key] = BackupStore(key)
+        return _backup_stores[key]
+
+def close_backup_stores():
+    with _backup_stores_lock:
+        for store in _backup_stores.values():
+            store.close()
+        _backup_stores.clear()
+
+def backup_file(file_path, backup_dir):
+    """
+    Создает резервную копию файла в хранилище в папке Backup.
+    Одинаковое содержимое хранится один раз, имена файлов не конфликтуют.
+    Возвращает путь к копии или None при ошибке.
+    """
+    try:
+        backup_path, method = get_backup_store(backup_dir).backup(file_path)
+        logging.info(f"Резервная копия файла {os.path.basename(file_path)} в {backup_dir}: {method}.")
+        return backup_path
+    except Exception as e:
+        logging.error(f"Ошибка при создании резервной копии файла {file_path}: {e}")
+        return None
+
+def _directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.lstat(os.path.join(root, name)).st_size
+    return total
+
+def benchmark_backup(files=500, runs=3):
+    """
+    Замер: прежние плоские копии shutil.copy2 против хранилища с адресацией по содержимому.
+    В дереве files файлов, треть из них повторяет содержимое других; дерево копируется runs раз.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source")
+        os.makedirs(source)
+        for i in range(files):
+            with open(os.path.join(source, f"file{i}.py"), "wb") as f:
+                f.write((f"# {i % (files * 2 // 3 or 1)}\n" * 2000).encode())
+        paths = [os.path.join(source, name) for name in sorted(os.listdir(source))]
+
+        flat_dir = os.path.join(tmp, "flat")
+        store = BackupStore(os.path.join(tmp, "store"))
+        try:
+            for run in range(1, runs + 1):
+                start = time.perf_counter()
+                run_dir = os.path.join(flat_dir, str(run))
+                os.makedirs(run_dir)
+                for path in paths:
+                    shutil.copy2(path, run_dir)
+                flat_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                methods = {}
+                for path in paths:
+                    method = store.backup(path)[1]
+                    methods[method] = methods.get(method, 0) + 1
+                store_time = time.perf_counter() - start
+
+                print(f"Проход {run}: copy2 {flat_time:.2f} с, {_directory_size(flat_dir) / 1e6:.1f} МБ; "
+                      f"хранилище {store_time:.2f} с, {_directory_size(store.objects_dir) / 1e6:.1f} МБ "
+                      f"({', '.join(f'{name}: {count}' for name, count in sorted(methods.items()))})")
+        finally:
+            store.close()
+
+class GitHubClient:
+    """
+    Клиент GitHub API с общим пулом соединений.
+    Список репозиториев пользователя загружается один раз постранично, а не проверяется
+    отдельным запросом для каждого проекта. Создание репозиториев идёт в несколько потоков;
+    при исчерпании лимита запросов все потоки ждут его сброса.
+    """
+
+    def __init__(self, token=None, username=None, api_url=None,
+                 max_workers=GITHUB_MAX_WORKERS, timeout=GITHUB_TIMEOUT, sleep=time.sleep):
+        self.username = username or GITHUB_USERNAME
+        self.api_url = (api_url or GITHUB_API_URL).rstrip("/")
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._pause_until = 0.0
+        self._repo_names = None
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"token {token or GITHUB_TOKEN}".encode('ascii').decode('latin-1'),
+            "Accept": "application/vnd.github.v3+json",
+        })
+        # Обрывы соединения повторяет urllib3; лимиты и ответы 5xx обрабатывает _request
+        retry = Retry(total=3, connect=3, read=0, status=0, backoff_factor=0.5)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _retry_after_seconds(value):
+        """
+        Разбирает Retry-After: число секунд или HTTP-дата. Возвращает None, если разобрать не удалось.
+        """
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if moment is None:
+            return None
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return max((moment - datetime.now(timezone.utc)).total_seconds(), 0)
+
+    def _wait_before_retry(self, response, attempt, method):
+        """
+        Возвращает паузу перед повтором запроса в секундах или None, если повторять не нужно.
+        """
+        headers = response.headers
+        if response.status_code in (403, 429):
+            if headers.get("Retry-After"):
+                wait = self._retry_after_seconds(headers["Retry-After"])
+                if wait is not None:
+                    return wait
+                logging.warning(f"Не удалось разобрать Retry-After: {headers['Retry-After']!r}")
+            if headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset", "").isdigit():
+                return max(float(headers["X-RateLimit-Reset"]) - time.time(), 0) + 1
+            if response.status_code == 429:
+                return GITHUB_BACKOFF * 2 ** attempt
+            return None
+        # POST при ошибке сервера не повторяем: репозиторий мог успеть создаться
+        if response.status_code >= 500 and method == "GET":
+            return GITHUB_BACKOFF * 2 ** attempt
+        return None
+
+    def _request(self, method, url, **kwargs):
+        """
+        Выполняет запрос с таймаутом; при ограничении частоты ждёт и повторяет.
+        """
+        if not url.startswith(("http://", "https://")):
+            url = f"{self.api_url}{url}"
+        for attempt in range(GITHUB_MAX_RETRIES + 1):
+            with self._lock:
+                delay = self._pause_until - time.monotonic()
+            if delay > 0:
+                self._sleep(delay)
+
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            wait = self._wait_before_retry(response, attempt, method)
+            if wait is None or attempt == GITHUB_MAX_RETRIES:
+                return response
+            wait = min(wait, GITHUB_MAX_WAIT)
+            logging.warning(f"GitHub ответил {response.status_code} на {method} {url}, повтор через {wait:.0f} с.")
+            with self._lock:
+                self._pause_until = max(self._pause_until, time.monotonic() + wait)
+        return response
+
+    def list_repo_names(self):
+        """
+        Загружает имена всех репозиториев пользователя (GET /user/repos, по 100 на страницу).
+        GitHub не различает регистр имён, поэтому имена приводятся к нижнему регистру.
+        """
+        names = set()
+        url = "/user/repos?per_page=100&affiliation=owner"
+        while url:
+            response = self._request("GET", url)
+            response.raise_for_status()
+            names.update(repo["name"].lower() for repo in response.json())
+            url = response.links.get("next", {}).get("url")
+        return names
+
+    def repo_exists(self, repo_name):
+        """
+        Проверяет наличие репозитория по списку, загруженному один раз за сессию.
+        """
+        with self._lock:
+            loaded = self._repo_names is not None
+        if not loaded:
+            names = self.list_repo_names()
+            with self._lock:
+                if self._repo_names is None:
+                    self._repo_names = names
+        with self._lock:
+            return repo_name.lower() in self._repo_names
+
+    def create_repo(self, repo_name, private=False):
+        """
+        Создает новый репозиторий на GitHub.
+        Возвращает True, если репозиторий успешно создан, иначе False.
+        """
+        data = {
+            "name": repo_name,
+            "private": private,
+            "auto_init": False,
+        }
+        try:
+            response = self._request("POST", "/user/repos", json=data)
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Ошибка при создании репозитория {repo_name}: {e}")
+            return False
+        if response.status_code == 201:
+            with self._lock:
+                if self._repo_names is not None:
+                    self._repo_names.add(repo_name.lower())
+            logging.info(f"Репозиторий {repo_name} создан на GitHub.")
+            return True
+        try:
+            details = response.json()
+        except ValueError:
+            details = response.text
+        logging.error(f"Ошибка при создании репозитория {repo_name}: {response.status_code} {details}")
+        return False
+
+    def create_repos(self, repo_names, private=False):
+        """
+        Создает репозитории параллельно в max_workers потоков.
+        Возвращает словарь {имя: создан ли репозиторий}.
+        """
+        repo_names = list(dict.fromkeys(repo_names))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = pool.map(lambda name: self.create_repo(name, private), repo_names)
+            return dict(zip(repo_names, results))
+
+
+_github_client = None
+
+def get_github_client():
+    """
+    Возвращает общий клиент GitHub, создавая его при первом обращении.
+    """
+    global _github_client
+    if _github_client is None:
+        _github_client = GitHubClient()
+    return _github_client
+
+def check_github_repo_exists(repo_name):
+    """
+    Проверяет, существует ли репозиторий на GitHub.
+    Возвращает True, если репозиторий существует, иначе False.
+    """
+    try:
+        return get_github_client().repo_exists(repo_name)
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Ошибка при проверке репозитория на GitHub: {e}")
+        return False
+
+def create_github_repo(repo_name):
+    """
+    Создает новый репозиторий на GitHub.
+    Возвращает True, если репозиторий успешно создан, иначе False.
+    """
+    return get_github_client().create_repo(repo_name)
+
+def run_git(args, cwd, timeout=GIT_TIMEOUT):
+    """
+    Запускает git с рабочей папкой cwd (текущая папка процесса не меняется).
+    Возвращает (код возврата, вывод ошибок).
+    """
+    try:
+        result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True,
+                                encoding="utf-8", errors="replace", timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return -1, f"превышено время ожидания ({timeout} с)"
+    except OSError as e:
+        return -1, str(e)
+    return result.returncode, result.stderr.strip()
+
+def init_git_repo(project_path, repo_name, remote_url=None):
+    """
+    Инициализирует Git в локальной папке проекта и привязывает её к удаленному репозиторию на GitHub.
+    Повторный запуск для уже инициализированного проекта не создает пустых коммитов.
+    Возвращает True, если все шаги завершились успешно.
+    """
+    remote_url = remote_url or GIT_REMOTE_TEMPLATE.format(username=GITHUB_USERNAME, repo=repo_name)
+
+    def step(*args):
+        code, error = run_git(args, project_path)
+        if code != 0:
+            logging.error(f"Git в проекте {repo_name}: 'git {' '.join(args)}' завершился с кодом {code}: {error}")
+        return code == 0
+
+    if not step("init"):
+        return False
+    if not step("add", "-A"):
+        return False
+    # Коммитим, только если есть что коммитить (или коммитов ещё нет)
+    has_head = run_git(["rev-parse", "--verify", "-q", "HEAD"], project_path)[0] == 0
+    has_changes = run_git(["diff", "--cached", "--quiet"], project_path)[0] != 0
+    if (has_changes or not has_head) and not step("commit", "-m", "Initial commit"):
+        return False
+    if run_git(["remote", "get-url", "origin"], project_path)[0] == 0:
+        ok = step("remote", "set-url", "origin", remote_url)
+    else:
+        ok = step("remote", "add", "origin", remote_url)
+    if not (ok and step("branch", "-M", "main") and step("push", "-u", "origin", "main")):
+        return False
+
+    logging.info(f"Git репозиторий для проекта {repo_name} инициализирован и привязан к GitHub.")
+    return True
+
+def init_git_repos(projects, max_workers=GIT_MAX_WORKERS, remote_urls=None):
+    """
+    Инициализирует и отправляет несколько проектов параллельно (не больше max_workers одновременно).
+    projects - словарь {имя репозитория: путь к папке проекта},
+    remote_urls - необязательный словарь {имя репозитория: адрес удаленного репозитория}.
+    Возвращает словарь {имя: успешно ли}.
+    """
+    remote_urls = remote_urls or {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {name: pool.submit(init_git_repo, path, name, remote_urls.get(name))
+                   for name, path in projects.items()}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logging.error(f"Ошибка при инициализации Git для {name}: {e}")
+                results[name] = False
+        return results
+
+def benchmark_git(projects=20, workers=GIT_MAX_WORKERS):
+    """
+    Замер: инициализация и push проектов по одному и в workers потоков.
+    Удаленными репозиториями служат локальные bare-репозитории во временной папке.
+    """
+    env_defaults = {"GIT_AUTHOR_NAME": "bench", "GIT_AUTHOR_EMAIL": "bench@example.com",
+                    "GIT_COMMITTER_NAME": "bench", "GIT_COMMITTER_EMAIL": "bench@example.com"}
+    for key, value in env_defaults.items():
+        os.environ.setdefault(key, value)
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, pool_size in (("по одному", 1), (f"{workers} потока", workers)):
+            root = os.path.join(tmp, str(pool_size))
+            paths, remotes = {}, {}
+            for i in range(projects):
+                name = f"project{i}"
+                create_project_structure(root, name)
+                with open(os.path.join(root, name, "scripts", "main.py"), "w", encoding="utf-8") as f:
+                    f.write("print('hello')\n" * 100)
+                remote = os.path.join(root, "remotes", f"{name}.git")
+                code, error = run_git(["init", "--bare", "-q", remote], tmp)
+                if code != 0:
+                    raise RuntimeError(f"Не удалось создать bare-репозиторий: {error}")
+                paths[name], remotes[name] = os.path.join(root, name), remote
+
+            start = time.perf_counter()
+            results = init_git_repos(paths, pool_size, remotes)
+            timings[label] = time.perf_counter() - start
+            failed = [name for name, ok in results.items() if not ok]
+            if failed:
+                raise RuntimeError(f"Git не сработал для проектов: {', '.join(failed)}")
+
+    for label, elapsed in timings.items():
+        print(f"{projects} проектов, {label}: {elapsed:.2f} с")
+    return timings
+
+def sync_github_repos(projects, client=None, state=None, created=()):
+    """
+    Создает на GitHub репозитории для проектов, у которых их ещё нет, и инициализирует в них Git.
+    projects - словарь {имя репозитория: путь к папке проекта};
+    created - репозитории, уже созданные в прошлый запуск (им нужен только push).
+    Наличие репозиториев проверяется по одному списку, создание идёт параллельно.
+    Если передан state, каждый шаг сразу записывается в него.
+    """
+    client = client or get_github_client()
+    created = set(created)
+    try:
+        existing = {name for name in projects if name not in created and client.repo_exists(name)}
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Ошибка при получении списка репозиториев GitHub: {e}")
+        return
+    for name in sorted(existing):
+        logging.info(f"Репозиторий {name} уже существует на GitHub.")
+        if state:
+            state.set_repo_status(name, "exists")
+
+    results = client.create_repos(name for name in projects if name not in existing and name not in created)
+    for name, ok in results.items():
+        if ok:
+            created.add(name)
+            if state:
+                state.set_repo_status(name, "created")
+
+    pushed = init_git_repos({name: projects[name] for name in created if name in projects})
+    for name, ok in pushed.items():
+        if ok and state:
+            state.set_repo_status(name, "pushed")
+
+def register_file_rule(file_type, extensions=(), magic=(), folder=None):
+    """
+    Добавляет правило определения типа файла.
+    extensions - расширения с точкой, magic - сигнатуры (bytes) в начале файла,
+    folder - папка проекта для этого типа (по умолчанию совпадает с типом).
+    """
+    FILE_RULES.append({"type": file_type, "extensions": tuple(ext.lower() for ext in extensions), "magic": tuple(magic)})
+    FILE_TYPE_FOLDERS.setdefault(file_type, folder or file_type)
+
+def classify_file(path):
+    """
+    Возвращает тип файла по FILE_RULES или None, если тип не определен.
+    Файл читается (первые MAGIC_BYTES байт), только если не подошло ни одно расширение.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    for rule in FILE_RULES:
+        if extension in rule["extensions"]:
+            return rule["type"]
+    if not any(rule["magic"] for rule in FILE_RULES):
+        return None
+    try:
+        with open(path, "rb") as f:
+            head = f.read(MAGIC_BYTES)
+    except OSError:
+        return None
+    for rule in FILE_RULES:
+        if any(head.startswith(signature) for signature in rule["magic"]):
+            return rule["type"]
+    return None
+
+def scan_files(base_path, recursive=False, ignore=DEFAULT_IGNORE_PATTERNS, skip_dir=None):
+    """
+    Обходит base_path через os.scandir и возвращает DirEntry файлов.
+    Тип записи берется из данных scandir без отдельного stat на каждую запись.
+    ignore - шаблоны fnmatch для имени или пути относительно base_path;
+    skip_dir(entry) - дополнительный отбор папок при рекурсивном обходе.
+    """
+    folders = [base_path]
+    while folders:
+        with os.scandir(folders.pop()) as entries:
+            for entry in entries:
+                relative = os.path.relpath(entry.path, base_path).replace(os.sep, "/")
+                if any(fnmatch.fnmatch(entry.name, pattern) or fnmatch.fnmatch(relative, pattern) for pattern in ignore):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not (skip_dir and skip_dir(entry)):
+                        folders.append(entry.path)
+                elif entry.is_file():
+                    yield entry
+
+def move_file(source, target):
+    """
+    Перемещает файл. В пределах одной файловой системы - атомарным os.rename,
+    между разными - копированием через shutil.move. Возвращает "rename" или "copy".
+    """
+    try:
+        os.rename(source, target)
+        return "rename"
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    shutil.move(source, target)
+    return "copy"
+
+@dataclass(slots=True)
+class PlannedFile:
+    """
+    Что будет сделано с одним файлом.
+    """
+    source: str
+    name: str
+    project: str
+    file_type: str | None
+    target: str | None
+    size: int
+    same_device: bool
+    project_dir: str | None  # None - папку проекта создать нельзя: на её месте файл
+    conflict: str | None = None
+    move_aside: bool = False  # Файл сам лежит на месте папки своего проекта (скрипт без расширения)
+
+def plan_organization(base_path, state, recursive=False, ignore=DEFAULT_IGNORE_PATTERNS):
+    """
+    Составляет план: для каждого файла - проект, тип и место назначения.
+    Файлы ничего не меняют; конфликты (такой файл уже есть в проекте или на месте
+    папки проекта лежит файл, который не будет перемещен) отмечаются в плане.
+    Файл без расширения на верхнем уровне (например, скрипт run, опознанный по #!)
+    занимает место папки своего проекта; такой файл помечается move_aside и при
+    организации сначала переименовывается, а затем переносится в созданную папку.
+    """
+    base_device = os.stat(base_path).st_dev
+    project_folders = set(FILE_TYPE_FOLDERS.values())
+
+    def skip_dir(entry):
+        # При рекурсивном обходе не заходим в папки уже организованных проектов - известных базе
+        # или просто устроенных как проект (с папками scripts, data и т.п.) на любой глубине
+        if os.path.dirname(entry.path) == base_path.rstrip(os.sep) and state.has_project(entry.name):
+            return True
+        return any(os.path.isdir(os.path.join(entry.path, folder)) for folder in project_folders)
+
+    entries = [(entry, classify_file(entry.path)) for entry in scan_files(base_path, recursive, ignore, skip_dir)]
+    aside = {entry.path for entry, file_type in entries
+             if file_type and entry.path == os.path.join(base_path, os.path.splitext(entry.name)[0])}
+    plan, targets = [], set()
+    for entry, file_type in entries:
+        project = os.path.splitext(entry.name)[0]
+        stat = entry.stat()
+        project_dir = os.path.join(base_path, project)
+        target = os.path.join(project_dir, FILE_TYPE_FOLDERS[file_type], entry.name) if file_type else None
+        # Файл уже на своем месте - перемещать и копировать нечего
+        if target and os.path.normcase(os.path.abspath(target)) == os.path.normcase(os.path.abspath(entry.path)):
+            continue
+        conflict = None
+        if os.path.exists(project_dir) and not os.path.isdir(project_dir) and project_dir not in aside:
+            conflict = f"папку проекта {project_dir} не создать: это файл"
+            project_dir = None
+        elif target and (target in targets or os.path.exists(target)):
+            conflict = f"{target} уже существует"
+        elif target:
+            targets.add(target)
+        plan.append(PlannedFile(entry.path, entry.name, project, file_type, target,
+                                stat.st_size, stat.st_dev == base_device, project_dir, conflict,
+                                entry.path in aside))
+    return plan
+
+def estimate_plan(plan, state, workers=ORGANIZE_MAX_WORKERS):
+    """
+    Грубая оценка стоимости плана: объемы, число операций и время в секундах.
+    Объем копий - верхняя граница: одинаковое содержимое хранилище сохранит один раз.
+    """
+    projects = set(item.project for item in plan if item.project_dir)
+    new_projects = {project for project in projects if not state.has_project(project)}
+    repos = set(state.pending_repos()) | {sanitize_project_name(project) for project in new_projects}
+    moves = [item for item in plan if item.target and not item.conflict]
+    copies = [item for item in moves if not item.same_device]
+    backup_bytes = sum(item.size for item in plan)
+    copy_bytes = sum(item.size for item in copies)
+
+    io_seconds = (backup_bytes + copy_bytes) / (ESTIMATE_DISK_MB_PER_S * 1024 * 1024)
+    io_seconds += len(plan) * ESTIMATE_FILE_OVERHEAD_S / workers
+    repo_seconds = len(repos) * ESTIMATE_REPO_S / min(GITHUB_MAX_WORKERS, GIT_MAX_WORKERS)
+    return {
+        "files": len(plan),
+        "new_projects": len(new_projects),
+        "renames": len(moves) - len(copies),
+        "copies": len(copies),
+        "unmoved": len(plan) - len(moves),
+        "backup_bytes": backup_bytes,
+        "copy_bytes": copy_bytes,
+        "repos": len(repos),
+        "seconds": io_seconds + repo_seconds,
+    }
+
+def format_plan(plan, estimate):
+    """
+    Текст плана для пробного запуска.
+    """
+    lines = []
+    for item in plan:
+        if item.conflict:
+            lines.append(f"ПРОПУСК  {item.source}: {item.conflict}")
+        elif item.target:
+            method = "rename" if item.same_device else "копирование"
+            lines.append(f"{item.file_type:<8} {item.source} -> {item.target} ({method})")
+        else:
+            lines.append(f"ПРОПУСК  {item.source}: тип не определен (только резервная копия)")
+    lines.append(
+        f"Файлов: {estimate['files']}, новых проектов: {estimate['new_projects']}, "
+        f"перемещений rename: {estimate['renames']}, копированием: {estimate['copies']}, "
+        f"без перемещения: {estimate['unmoved']}")
+    lines.append(
+        f"Резервные копии: до {estimate['backup_bytes'] / 1e6:.1f} МБ, копирование между дисками: "
+        f"{estimate['copy_bytes'] / 1e6:.1f} МБ, репозиториев GitHub: {estimate['repos']}")
+    lines.append(f"Оценка времени: ~{estimate['seconds']:.0f} с")
+    return "\n".join(lines)
+
+def _backup_item(item, backup_dir, state):
+    backup_path = backup_file(item.source, backup_dir)
+    if backup_path:
+        state.record_backup(item.project, item.name, item.source, backup_path)
+
+def _move_aside(item, backup_dir, state):
+    """
+    Освобождает место для папки проекта: делает резервную копию файла и переименовывает
+    его во временное имя рядом. Возвращает временный путь или None, если не удалось.
+    """
+    _backup_item(item, backup_dir, state)
+    staged = f"{item.source}.{os.getpid()}.tmp"
+    try:
+        os.rename(item.source, staged)
+        return staged
+    except OSError as e:
+        logging.error(f"Не удалось освободить место для папки проекта {item.project}: {e}")
+        return None
+
+def _organize_file(item, backup_dir, state, staged=None):
+    """
+    Резервная копия и перемещение одного файла (выполняется в пуле потоков).
+    staged - временный путь, куда файл уже отодвинут _move_aside (копия тогда уже сделана).
+    """
+    if staged is None:
+        _backup_item(item, backup_dir, state)
+
+    if item.file_type is None:
+        logging.warning(f"Файл {item.name} не был перемещен, так как его тип не определен.")
+        return
+    if item.conflict:
+        logging.warning(f"Файл {item.name} не был перемещен: {item.conflict}.")
+        return
+    try:
+        method = move_file(staged or item.source, item.target)
+        state.record_move(item.project, item.name, item.file_type, item.source, item.target)
+        logging.info(f"Файл {item.name} перемещен в папку {FILE_TYPE_FOLDERS[item.file_type]} проекта {item.project} ({method}).")
+    except Exception as e:
+        location = f" (файл остался в {staged})" if staged else ""
+        logging.error(f"Ошибка при перемещении файла {item.name}: {e}{location}")
+
+def organize_scripts(base_path, state, dry_run=False, recursive=False,
+                     ignore=DEFAULT_IGNORE_PATTERNS, workers=ORGANIZE_MAX_WORKERS):
+    """
+    Организует файлы в папке base_path:
+    - Создает структуру для каждого проекта.
+    - Перемещает файлы в соответствующие папки (scripts или data).
+    - Создает резервные копии файлов.
+    - Проверяет и создает репозитории на GitHub (пакетно, после обработки всех файлов).
+    Каждое действие сразу записывается в state (ProjectState), поэтому прерванный запуск
+    можно просто повторить: недоделанные репозитории подхватятся из базы.
+    При dry_run ничего не меняется: выводятся план и оценка его стоимости.
+    Возвращает план (список PlannedFile).
+    """
+    backup_dir = os.path.join(base_path, "Backup")
+    plan = plan_organization(base_path, state, recursive, ignore)
+
+    if dry_run:
+        print(format_plan(plan, estimate_plan(plan, state, workers)))
+        return plan
+
+    # Файлы, лежащие на месте папки своего проекта, отодвигаем до создания структуры.
+    # Если переименовать не удалось, проект не создаем, а его файлы оставляем на месте
+    staged, blocked = {}, set()
+    for item in plan:
+        if item.move_aside and not item.conflict:
+            path = _move_aside(item, backup_dir, state)
+            if path:
+                staged[item.source] = path
+            else:
+                blocked.add(item.project)
+    for item in plan:
+        if item.project in blocked:
+            item.conflict = item.conflict or f"папку проекта {item.project_dir} не создать: это файл"
+            item.project_dir = None
+
+    # Структуры проектов создаем заранее, чтобы потоки не создавали одну папку одновременно
+    # Проекты, чья папка занята файлом, не создаем и не регистрируем - иначе для них появится репозиторий
+    for project in dict.fromkeys(item.project for item in plan if item.project_dir):
+        if not state.has_project(project):
+            create_project_structure(base_path, project)
+        state.add_project(project, os.path.abspath(os.path.join(base_path, project)), sanitize_project_name(project))
+
+    # Копирование и перемещение ограничены диском, а не процессором - перекрываем их в потоках
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda item: _organize_file(item, backup_dir, state, staged.get(item.source)), plan))
+
+    # Репозитории проверяем и создаем пакетно - и для новых проектов, и для недоделанных в прошлый раз
+    pending = state.pending_repos()
+    sync_github_repos(pending, state=state, created=state.created_repos())
+    return plan
+
+def main():
+    """
+    Основная функция скрипта.
+    """
+    parser = argparse.ArgumentParser(description="Организация скриптов по проектам")
+    parser.add_argument("folder", nargs="?", help="папка с вашими скриптами и проектами")
+    parser.add_argument("--dry-run", action="store_true", help="только показать план и его оценку")
+    parser.add_argument("--recursive", action="store_true", help="обходить и вложенные папки")
+    parser.add_argument("--ignore", action="append", default=[], metavar="PATTERN",
+                        help="пропускать файлы и папки по шаблону (можно указать несколько раз)")
+    parser.add_argument("--workers", type=int, default=ORGANIZE_MAX_WORKERS, help="потоков для копирования и перемещения")
+    parser.add_argument("--bench-backup", nargs="?", type=int, const=500, metavar="N",
+                        help="замер резервного копирования дерева из N файлов")
+    parser.add_argument("--bench-git", nargs="?", type=int, const=20, metavar="N",
+                        help="замер инициализации и push N проектов в локальные bare-репозитории")
+    args = parser.parse_args()
+
+    if args.bench_git or args.bench_backup:
+        if args.bench_git:
+            benchmark_git(args.bench_git)
+        if args.bench_backup:
+            benchmark_backup(args.bench_backup)
+        return
+
+    # Устанавливаем зависимости при первом запуске (пробный запуск ничего не устанавливает)
+    if not args.dry_run:
+        install_dependencies()
+    
+    # Укажите путь к папке с вашими скриптами и проектами
+    scripts_folder = args.folder or input("Введите путь к папке с вашими скриптами и проектами: ")
+    
+    if not os.path.exists(scripts_folder):
+        print(f"Папка {scripts_folder} не существует.")
+        return
+    
+    # Открываем базу состояния (при первом запуске переносим в неё config.json).
+    # При пробном запуске работаем с копией в памяти: перенос config.json виден в плане, но не сохраняется
+    with ProjectState(readonly=args.dry_run) as state:
+        state.import_config()
+        
+        # Организуем файлы в папке
+        try:
+            organize_scripts(scripts_folder, state, dry_run=args.dry_run, recursive=args.recursive,
+                             ignore=DEFAULT_IGNORE_PATTERNS + tuple(args.ignore), workers=args.workers)
+        finally:
+            close_backup_stores()
+    if not args.dry_run:
+        print("Организация проектов завершена.")
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
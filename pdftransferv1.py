@@ -1,189 +1,786 @@
-﻿import sys
-import fitz  # PyMuPDF
-import pdfplumber
-from PIL import Image
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import Table, TableStyle, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
-from PyQt6.QtWidgets import QApplication, QWidget, QPushButton, QVBoxLayout, QFileDialog, QLabel, QHBoxLayout, QGraphicsView, QGraphicsScene, QGraphicsPixmapItem
-from PyQt6.QtGui import QPixmap
-
-
-class PDFFormatterApp(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.initUI()
-
-    def initUI(self):
-        self.setWindowTitle("PDF Formatter")
-        self.setGeometry(100, 100, 600, 400)
-
-        self.label_input = QLabel("Выберите входной PDF")
-        self.label_template = QLabel("Выберите PDF-шаблон")
-        self.label_output = QLabel("Выберите путь для сохранения")
-
-        self.btn_input = QPushButton("Выбрать входной PDF")
-        self.btn_input.clicked.connect(self.select_input_pdf)
-
-        self.btn_template = QPushButton("Выбрать PDF-шаблон")
-        self.btn_template.clicked.connect(self.select_template_pdf)
-
-        self.btn_output = QPushButton("Выбрать путь сохранения")
-        self.btn_output.clicked.connect(self.select_output_pdf)
-
-        self.btn_preview = QPushButton("Предпросмотр")
-        self.btn_preview.clicked.connect(self.preview_pdf)
-
-        self.btn_process = QPushButton("Применить формат")
-        self.btn_process.clicked.connect(self.process_pdf)
-
-        self.preview_view = QGraphicsView()
-        self.scene = QGraphicsScene()
-        self.preview_view.setScene(self.scene)
-
-        layout = QVBoxLayout()
-        layout.addWidget(self.label_input)
-        layout.addWidget(self.btn_input)
-        layout.addWidget(self.label_template)
-        layout.addWidget(self.btn_template)
-        layout.addWidget(self.label_output)
-        layout.addWidget(self.btn_output)
-
-        preview_layout = QHBoxLayout()
-        preview_layout.addWidget(self.btn_preview)
-        preview_layout.addWidget(self.preview_view)
-
-        layout.addLayout(preview_layout)
-        layout.addWidget(self.btn_process)
-
-        self.setLayout(layout)
-
-        self.input_pdf = None
-        self.template_pdf = None
-        self.output_pdf = None
-
-    def select_input_pdf(self):
-        file, _ = QFileDialog.getOpenFileName(self, "Выбрать входной PDF", "", "PDF Files (*.pdf)")
-        if file:
-            self.input_pdf = file
-            self.label_input.setText(f"Выбран: {file}")
-
-    def select_template_pdf(self):
-        file, _ = QFileDialog.getOpenFileName(self, "Выбрать PDF-шаблон", "", "PDF Files (*.pdf)")
-        if file:
-            self.template_pdf = file
-            self.label_template.setText(f"Выбран: {file}")
-
-    def select_output_pdf(self):
-        file, _ = QFileDialog.getSaveFileName(self, "Сохранить PDF как", "", "PDF Files (*.pdf)")
-        if file:
-            self.output_pdf = file
-            self.label_output.setText(f"Сохранить как: {file}")
-
-    def preview_pdf(self):
-        if self.template_pdf:
-            images = convert_pdf_to_images(self.template_pdf)
-            if images:
-                pixmap = QPixmap(images[0])
-                self.scene.clear()
-                self.scene.addPixmap(pixmap)
-        else:
-            self.label_output.setText("Выберите шаблон!")
-
-    def process_pdf(self):
-        if self.input_pdf and self.template_pdf and self.output_pdf:
-            apply_format(self.input_pdf, self.output_pdf, self.template_pdf)
-        else:
-            self.label_output.setText("Выберите все файлы!")
-
-
-def extract_format(template_pdf):
-    """Извлекает шрифты, размеры текста, отступы и таблицы из шаблона PDF."""
-    data = {"text": [], "tables": [], "fonts": {}}
-
-    with pdfplumber.open(template_pdf) as pdf:
-        for page in pdf.pages:
-            words = page.extract_words()
-            for word in words:
-                data["text"].append({
-                    "text": word["text"],
-                    "x": word["x0"],
-                    "y": page.height - word["top"],
-                    "size": word["height"]
-                })
-            tables = page.extract_tables()
-            if tables:
-                data["tables"].append(tables)
-
-    doc = fitz.open(template_pdf)
-    for page in doc:
-        for text in page.get_text("dict")["blocks"]:
-            if "spans" in text:
-                for span in text["spans"]:
-                    font_name = span["font"]
-                    font_size = span["size"]
-                    data["fonts"][font_name] = font_size
-
-    return data
-
-
-def apply_format(input_pdf, output_pdf, template_pdf):
-    """Применяет формат шаблона к новому PDF."""
-    template_data = extract_format(template_pdf)
-    doc = fitz.open(input_pdf)
-    output = canvas.Canvas(output_pdf, pagesize=letter)
-
-    styles = getSampleStyleSheet()
-    normal_style = styles["Normal"]
-
-    for page_num, page in enumerate(doc):
-        if page_num < len(template_data["text"]):
-            text_data = template_data["text"]
-            for item in text_data:
-                font_name = list(template_data["fonts"].keys())[0] if template_data["fonts"] else "Helvetica"
-                font_size = template_data["fonts"].get(font_name, 12)
-                output.setFont(font_name, font_size)
-                output.drawString(item["x"], item["y"], item["text"])
-
-        if page_num < len(template_data["tables"]):
-            table_data = template_data["tables"]
-
-            # Преобразование всех значений в Paragraph
-            formatted_table = []
-            for row in table_data[0]:  # Берем первую таблицу на странице
-                formatted_table.append([Paragraph(str(cell), normal_style) for cell in row])
-
-            table = Table(formatted_table, colWidths=100, rowHeights=20)
-            table.setStyle(TableStyle([
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('FONT', (0, 0), (-1, -1), 'Helvetica', 10)
-            ]))
-            table.wrapOn(output, 100, 600)
-            table.drawOn(output, 100, 600)
-
-        output.showPage()
-
-    output.save()
-    print(f"Файл сохранен: {output_pdf}")
-
-
-def convert_pdf_to_images(pdf_path):
-    """Конвертирует PDF в изображения для предпросмотра."""
-    images = []
-    doc = fitz.open(pdf_path)
-    for page in doc:
-        pix = page.get_pixmap()
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        img_path = f"preview_page.png"
-        img.save(img_path)
-        images.append(img_path)
-    return images
-
-
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = PDFFormatterApp()
-    window.show()
-    sys.exit(app.exec())
+﻿import os
+import sys
+import glob
+import time
+import argparse
+import gzip
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import fitz  # PyMuPDF
+import pdfplumber
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.platypus import Table, TableStyle, Paragraph
+from reportlab.lib.styles import getSampleStyleSheet
+from PyQt6.QtWidgets import QApplication, QWidget, QPushButton, QVBoxLayout, QFileDialog, QLabel, QHBoxLayout, QGraphicsView, QGraphicsScene, QGraphicsPixmapItem, QProgressBar
+from PyQt6.QtGui import QPixmap, QImage
+from PyQt6.QtCore import QThread, pyqtSignal
+
+# Версия формата данных extract_format; при изменении извлечения старые записи кэша игнорируются
+EXTRACTOR_VERSION = 2
+
+# Кэш разобранных шаблонов
+TEMPLATE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pdftransfer")
+TEMPLATE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Масштаб предпросмотра и число страниц, которые держатся в памяти
+PREVIEW_ZOOM = 1.0
+PREVIEW_CACHE_PAGES = 16
+# Сколько открытых документов держит предпросмотр (текущий шаблон и несколько предыдущих)
+PREVIEW_CACHE_DOCS = 2
+
+
+class PDFFormatterApp(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.initUI()
+
+    def initUI(self):
+        self.setWindowTitle("PDF Formatter")
+        self.setGeometry(100, 100, 600, 400)
+
+        self.label_input = QLabel("Выберите входной PDF")
+        self.label_template = QLabel("Выберите PDF-шаблон")
+        self.label_output = QLabel("Выберите путь для сохранения")
+
+        self.btn_input = QPushButton("Выбрать входной PDF")
+        self.btn_input.clicked.connect(self.select_input_pdf)
+
+        self.btn_template = QPushButton("Выбрать PDF-шаблон")
+        self.btn_template.clicked.connect(self.select_template_pdf)
+
+        self.btn_output = QPushButton("Выбрать путь сохранения")
+        self.btn_output.clicked.connect(self.select_output_pdf)
+
+        self.btn_preview = QPushButton("Предпросмотр")
+        self.btn_preview.clicked.connect(self.preview_pdf)
+
+        self.btn_prev_page = QPushButton("<")
+        self.btn_prev_page.clicked.connect(lambda: self.show_preview_page(self.preview_page - 1))
+        self.btn_next_page = QPushButton(">")
+        self.btn_next_page.clicked.connect(lambda: self.show_preview_page(self.preview_page + 1))
+        self.label_page = QLabel("")
+
+        self.btn_process = QPushButton("Применить формат")
+        self.btn_process.clicked.connect(self.process_pdf)
+
+        self.preview_view = QGraphicsView()
+        self.scene = QGraphicsScene()
+        self.preview_view.setScene(self.scene)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.label_input)
+        layout.addWidget(self.btn_input)
+        layout.addWidget(self.label_template)
+        layout.addWidget(self.btn_template)
+        layout.addWidget(self.label_output)
+        layout.addWidget(self.btn_output)
+
+        preview_controls = QVBoxLayout()
+        preview_controls.addWidget(self.btn_preview)
+        preview_controls.addWidget(self.btn_prev_page)
+        preview_controls.addWidget(self.btn_next_page)
+        preview_controls.addWidget(self.label_page)
+        preview_controls.addStretch()
+
+        preview_layout = QHBoxLayout()
+        preview_layout.addLayout(preview_controls)
+        preview_layout.addWidget(self.preview_view)
+
+        self.progress_bar = QProgressBar()
+
+        layout.addLayout(preview_layout)
+        layout.addWidget(self.btn_process)
+        layout.addWidget(self.progress_bar)
+
+        self.setLayout(layout)
+
+        self.input_pdfs = []
+        self.template_pdf = None
+        self.output_pdf = None
+
+        self.renderer = PageRenderer()
+        self.preview_page = 0
+
+    def select_input_pdf(self):
+        files, _ = QFileDialog.getOpenFileNames(self, "Выбрать входной PDF", "", "PDF Files (*.pdf)")
+        if files:
+            self.input_pdfs = files
+            if len(files) == 1:
+                self.label_input.setText(f"Выбран: {files[0]}")
+            else:
+                self.label_input.setText(f"Выбрано файлов: {len(files)}")
+
+    def select_template_pdf(self):
+        file, _ = QFileDialog.getOpenFileName(self, "Выбрать PDF-шаблон", "", "PDF Files (*.pdf)")
+        if file:
+            self.template_pdf = file
+            self.preview_page = 0
+            self.label_template.setText(f"Выбран: {file}")
+
+    def select_output_pdf(self):
+        file, _ = QFileDialog.getSaveFileName(self, "Сохранить PDF как", "", "PDF Files (*.pdf)")
+        if file:
+            self.output_pdf = file
+            self.label_output.setText(f"Сохранить как: {file}")
+
+    def preview_pdf(self):
+        if self.template_pdf:
+            self.show_preview_page(self.preview_page)
+        else:
+            self.label_output.setText("Выберите шаблон!")
+
+    def show_preview_page(self, page_number):
+        if not self.template_pdf:
+            return
+        page_count = self.renderer.page_count(self.template_pdf)
+        if not 0 <= page_number < page_count:
+            return
+
+        self.preview_page = page_number
+        pixmap = self.renderer.pixmap(self.template_pdf, page_number, PREVIEW_ZOOM)
+        self.scene.clear()
+        self.scene.addPixmap(pixmap)
+        self.label_page.setText(f"{page_number + 1} / {page_count}")
+
+        # Соседние страницы рендерятся заранее, чтобы листание было мгновенным
+        self.renderer.prefetch(self.template_pdf, (page_number - 1, page_number + 1), PREVIEW_ZOOM)
+
+    def closeEvent(self, event):
+        self.renderer.close()
+        super().closeEvent(event)
+
+    def process_pdf(self):
+        if not (self.input_pdfs and self.template_pdf and self.output_pdf):
+            self.label_output.setText("Выберите все файлы!")
+            return
+
+        if len(self.input_pdfs) == 1:
+            jobs = [(self.input_pdfs[0], self.output_pdf)]
+        else:
+            # При нескольких входных файлах результаты кладутся рядом с выбранным путём сохранения
+            jobs = make_batch_jobs(self.input_pdfs, os.path.dirname(self.output_pdf))
+
+        self.btn_process.setEnabled(False)
+        self.progress_bar.setRange(0, len(jobs))
+        self.progress_bar.setValue(0)
+
+        self.worker = BatchWorker(self.template_pdf, jobs)
+        self.worker.progress.connect(self.on_batch_progress)
+        self.worker.finished_batch.connect(self.on_batch_finished)
+        self.worker.failed.connect(self.on_batch_failed)
+        self.worker.start()
+
+    def on_batch_progress(self, done, total, message):
+        self.progress_bar.setValue(done)
+        self.label_output.setText(message)
+
+    def on_batch_finished(self, results):
+        self.btn_process.setEnabled(True)
+        failed = [r for r in results if r["error"]]
+        if failed:
+            self.label_output.setText(f"Готово, ошибок: {len(failed)} из {len(results)}")
+        else:
+            self.label_output.setText(f"Готово: {len(results)} файл(ов)")
+
+    def on_batch_failed(self, message):
+        self.btn_process.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.label_output.setText(f"Ошибка: {message}")
+
+
+class BatchWorker(QThread):
+    """Запускает run_batch в отдельном потоке, чтобы не блокировать интерфейс."""
+    progress = pyqtSignal(int, int, str)
+    finished_batch = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, template_pdf, jobs):
+        super().__init__()
+        self.template_pdf = template_pdf
+        self.jobs = jobs
+
+    def run(self):
+        def report(done, total, result):
+            self.progress.emit(done, total, _format_batch_result(result))
+
+        try:
+            results = run_batch(self.template_pdf, self.jobs, progress=report)
+        except Exception as e:
+            # Нечитаемый шаблон, сбой пула и т.п. - пакет не выполнен целиком
+            self.failed.emit(str(e))
+            return
+        self.finished_batch.emit(results)
+
+
+def _has_ruled_lines(page):
+    """Проверяет, есть ли на странице линии или прямоугольники, из которых состоят таблицы."""
+    for drawing in page.get_drawings():
+        for item in drawing["items"]:
+            if item[0] in ("l", "re"):
+                return True
+    return False
+
+
+def _word_font(spans, center_x, height):
+    """Находит шрифт и размер спана, в который попадает центр слова."""
+    if not spans:
+        return "Helvetica", height
+    for x0, x1, font, size in spans:
+        if x0 <= center_x <= x1:
+            return font, size
+    _, _, font, size = spans[0]
+    return font, size
+
+
+def extract_format(template_pdf):
+    """Извлекает шрифты, размеры текста, отступы и таблицы из шаблона PDF.
+
+    Документ разбирается PyMuPDF один раз: слова и шрифты берутся из одного
+    TextPage на страницу. pdfplumber открывается только если на каких-то
+    страницах есть линии разметки, и таблицы ищутся только на этих страницах.
+    """
+    data = {"text": [], "tables": [], "table_pages": [], "fonts": {}}
+    ruled_pages = []
+
+    doc = fitz.open(template_pdf)
+    try:
+        for page in doc:
+            textpage = page.get_textpage()
+
+            # Спаны каждой строки: (номер блока, номер строки) -> [(x0, x1, шрифт, размер)]
+            line_spans = {}
+            for block in page.get_text("dict", textpage=textpage)["blocks"]:
+                for line_no, line in enumerate(block.get("lines", [])):
+                    spans = line_spans.setdefault((block["number"], line_no), [])
+                    for span in line["spans"]:
+                        data["fonts"][span["font"]] = span["size"]
+                        spans.append((span["bbox"][0], span["bbox"][2], span["font"], span["size"]))
+
+            for x0, y0, x1, y1, word, block_no, line_no, _ in page.get_text("words", textpage=textpage):
+                font, size = _word_font(line_spans.get((block_no, line_no)), (x0 + x1) / 2, y1 - y0)
+                data["text"].append({
+                    "text": word,
+                    "x": x0,
+                    "y": page.rect.height - y0,
+                    "size": size,
+                    "font": font,
+                    "page": page.number
+                })
+
+            if _has_ruled_lines(page):
+                ruled_pages.append(page.number)
+    finally:
+        doc.close()
+
+    if ruled_pages:
+        with pdfplumber.open(template_pdf, pages=[n + 1 for n in ruled_pages]) as pdf:
+            for page_number, page in zip(ruled_pages, pdf.pages):
+                tables = page.extract_tables()
+                if tables:
+                    data["tables"].append(tables)
+                    data["table_pages"].append(page_number)
+
+    return data
+
+
+def _file_hash(path, chunk_size=1024 * 1024):
+    """Считает SHA-256 содержимого файла, читая его блоками."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _evict_template_cache(cache_dir, max_bytes):
+    """Удаляет давно не использованные записи кэша, пока его размер больше max_bytes."""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith(".json.gz"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def load_template_format(template_pdf, cache_dir=TEMPLATE_CACHE_DIR, max_bytes=TEMPLATE_CACHE_MAX_BYTES):
+    """Возвращает результат extract_format для шаблона, используя кэш на диске.
+
+    Ключ кэша - хэш содержимого шаблона и EXTRACTOR_VERSION, так что переименование
+    файла не сбрасывает кэш, а изменение содержимого - сбрасывает. Время изменения
+    записи обновляется при каждом попадании и служит меткой для LRU-вытеснения.
+    """
+    cache_path = os.path.join(cache_dir, f"{_file_hash(template_pdf)}-v{EXTRACTOR_VERSION}.json.gz")
+
+    try:
+        with gzip.open(cache_path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        os.utime(cache_path)
+        return data
+    except (OSError, ValueError):
+        # Записи нет или она повреждена - просто пересоздаём её
+        pass
+
+    data = extract_format(template_pdf)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, cache_path)
+        finally:
+            # Недописанный временный файл вытеснение не видит - удаляем его сразу
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        _evict_template_cache(cache_dir, max_bytes)
+    except OSError as e:
+        print(f"Не удалось сохранить кэш шаблона: {e}")
+
+    return data
+
+
+def index_layout(template_data):
+    """Раскладывает данные шаблона по страницам.
+
+    Для каждой страницы возвращает {"runs": [...], "tables": [...]}, где runs -
+    последовательности слов с одинаковым шрифтом и размером в виде
+    (шрифт, размер, [(x, y, текст), ...]). Так при выводе шрифт меняется только
+    на границе серии, а не для каждого слова.
+    """
+    page_count = max([item["page"] for item in template_data["text"]] + template_data["table_pages"], default=-1) + 1
+    pages = [{"runs": [], "tables": []} for _ in range(page_count)]
+
+    for item in template_data["text"]:
+        runs = pages[item["page"]]["runs"]
+        key = (item["font"], round(item["size"], 1))
+        if not runs or runs[-1][:2] != key:
+            runs.append((key[0], key[1], []))
+        runs[-1][2].append((item["x"], item["y"], item["text"]))
+
+    for page_number, tables in zip(template_data["table_pages"], template_data["tables"]):
+        pages[page_number]["tables"] = tables
+
+    return pages
+
+
+@lru_cache(maxsize=None)
+def _resolve_font(font_name):
+    """Подбирает стандартный шрифт reportlab, ближайший к шрифту из шаблона."""
+    name = font_name.lower()
+    if "times" in name or ("serif" in name and "sans" not in name):
+        family = "Times"
+    elif "courier" in name or "mono" in name:
+        family = "Courier"
+    else:
+        family = "Helvetica"
+    bold = "bold" in name
+    italic = "italic" in name or "oblique" in name
+    if family == "Times":
+        suffix = {(False, False): "-Roman", (True, False): "-Bold",
+                  (False, True): "-Italic", (True, True): "-BoldItalic"}[(bold, italic)]
+    else:
+        suffix = {(False, False): "", (True, False): "-Bold",
+                  (False, True): "-Oblique", (True, True): "-BoldOblique"}[(bold, italic)]
+    return family + suffix
+
+
+def apply_format(input_pdf, output_pdf, template_pdf, template_data=None):
+    """Применяет формат шаблона к новому PDF.
+
+    Если template_data уже извлечён (например, один раз на весь пакет), шаблон повторно не разбирается.
+    """
+    if template_data is None:
+        template_data = load_template_format(template_pdf)
+    with fitz.open(input_pdf) as doc:
+        page_count = len(doc)
+    output = canvas.Canvas(output_pdf, pagesize=letter)
+    layout = index_layout(template_data)
+
+    styles = getSampleStyleSheet()
+    normal_style = styles["Normal"]
+
+    for page_num in range(page_count):
+        page_layout = layout[page_num] if page_num < len(layout) else None
+
+        if page_layout and page_layout["runs"]:
+            # Вся страница выводится одним текстовым объектом, шрифт меняется только между сериями
+            text = output.beginText()
+            current_font = None
+            for font_name, font_size, words in page_layout["runs"]:
+                font = (_resolve_font(font_name), font_size)
+                if font != current_font:
+                    text.setFont(*font)
+                    current_font = font
+                for x, y, word in words:
+                    text.setTextOrigin(x, y)
+                    text.textOut(word)
+            output.drawText(text)
+
+        if page_layout and page_layout["tables"]:
+            # Преобразование всех значений в Paragraph
+            formatted_table = []
+            for row in page_layout["tables"][0]:  # Берем первую таблицу на странице
+                formatted_table.append([Paragraph("" if cell is None else str(cell), normal_style) for cell in row])
+
+            table = Table(formatted_table, colWidths=100, rowHeights=20)
+            table.setStyle(TableStyle([
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                ('FONT', (0, 0), (-1, -1), 'Helvetica', 10)
+            ]))
+            table.wrapOn(output, 100, 600)
+            table.drawOn(output, 100, 600)
+
+        output.showPage()
+
+    output.save()
+    print(f"Файл сохранен: {output_pdf}")
+
+
+# Данные шаблона в процессе-обработчике пакета; передаются один раз через initializer
+_worker_template = None
+
+
+def _init_batch_worker(template_pdf, template_data):
+    global _worker_template
+    _worker_template = (template_pdf, template_data)
+
+
+def _format_one(input_pdf, output_pdf):
+    """Форматирует один файл пакета и возвращает запись с временем и ошибкой (если была)."""
+    template_pdf, template_data = _worker_template
+    start = time.perf_counter()
+    error = None
+    try:
+        apply_format(input_pdf, output_pdf, template_pdf, template_data=template_data)
+    except Exception as e:
+        error = str(e)
+    return {"input": input_pdf, "output": output_pdf, "seconds": time.perf_counter() - start, "error": error}
+
+
+def _format_batch_result(result):
+    name = os.path.basename(result["input"])
+    if result["error"]:
+        return f"{name}: ошибка - {result['error']}"
+    return f"{name}: {result['seconds']:.2f} с"
+
+
+def collect_input_pdfs(source):
+    """Возвращает отсортированный список PDF из папки или по glob-шаблону."""
+    if os.path.isdir(source):
+        source = os.path.join(source, "*.pdf")
+    return sorted(path for path in glob.glob(source) if os.path.isfile(path))
+
+
+def make_batch_jobs(input_pdfs, output_dir):
+    """Составляет пары (входной, выходной) PDF; выходные файлы называются как входные."""
+    jobs = []
+    for input_pdf in input_pdfs:
+        output_pdf = os.path.join(output_dir, os.path.basename(input_pdf))
+        if os.path.abspath(output_pdf) == os.path.abspath(input_pdf):
+            stem, ext = os.path.splitext(output_pdf)
+            output_pdf = f"{stem}_formatted{ext}"
+        jobs.append((input_pdf, output_pdf))
+    return jobs
+
+
+def run_batch(template_pdf, jobs, workers=None, progress=None):
+    """Применяет шаблон к списку пар (входной, выходной) PDF в пуле процессов.
+
+    Шаблон разбирается один раз в текущем процессе. Ошибка в одном файле не
+    останавливает пакет: она попадает в поле "error" записи результата.
+    progress(done, total, result) вызывается по мере завершения файлов.
+    """
+    if not jobs:
+        return []
+
+    template_data = load_template_format(template_pdf)
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                             initargs=(template_pdf, template_data)) as pool:
+        futures = {pool.submit(_format_one, input_pdf, output_pdf): (input_pdf, output_pdf)
+                   for input_pdf, output_pdf in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # Например, процесс-обработчик аварийно завершился
+                input_pdf, output_pdf = futures[future]
+                result = {"input": input_pdf, "output": output_pdf, "seconds": 0.0, "error": str(e)}
+            results.append(result)
+            if progress:
+                progress(len(results), len(jobs), result)
+
+    return results
+
+
+def run_cli(argv):
+    """Пакетный режим без интерфейса."""
+    parser = argparse.ArgumentParser(description="Применение формата PDF-шаблона к набору PDF")
+    parser.add_argument("--template", required=True, help="PDF-шаблон")
+    parser.add_argument("--inputs", required=True, help="папка или glob-шаблон входных PDF")
+    parser.add_argument("--output-dir", required=True, help="папка для результатов")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию - число ядер)")
+    args = parser.parse_args(argv)
+
+    input_pdfs = collect_input_pdfs(args.inputs)
+    if not input_pdfs:
+        print(f"Не найдено PDF: {args.inputs}")
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = make_batch_jobs(input_pdfs, args.output_dir)
+
+    start = time.perf_counter()
+    results = run_batch(args.template, jobs, workers=args.workers,
+                        progress=lambda done, total, result: print(f"[{done}/{total}] {_format_batch_result(result)}"))
+    failed = sum(1 for result in results if result["error"])
+    print(f"Обработано {len(results) - failed} из {len(results)} за {time.perf_counter() - start:.2f} с")
+    return 1 if failed else 0
+
+
+class PageRenderer:
+    """Рендерит страницы PDF по запросу и держит последние из них в LRU-кэше QPixmap.
+
+    Ключ кэша - (файл, страница, масштаб). Страницы для упреждающего рендеринга
+    готовятся в фоновом потоке в виде QImage (QPixmap можно создавать только в
+    потоке интерфейса) и превращаются в QPixmap при первом показе.
+    """
+
+    def __init__(self, max_pages=PREVIEW_CACHE_PAGES, max_docs=PREVIEW_CACHE_DOCS):
+        self.max_pages = max_pages
+        self.max_docs = max_docs
+        self._pixmaps = OrderedDict()
+        self._prefetched = OrderedDict()
+        self._pending = set()
+        self._docs = OrderedDict()
+        # fitz.Document нельзя использовать из нескольких потоков одновременно
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def _document(self, path):
+        """Открытый документ из LRU; вытесненные документы закрываются. Вызывать под self._lock."""
+        doc = self._docs.get(path)
+        if doc is None:
+            doc = self._docs[path] = fitz.open(path)
+            while len(self._docs) > self.max_docs:
+                _, evicted = self._docs.popitem(last=False)
+                evicted.close()
+        else:
+            self._docs.move_to_end(path)
+        return doc
+
+    def page_count(self, path):
+        with self._lock:
+            return len(self._document(path))
+
+    def _render(self, path, page_number, zoom):
+        """Возвращает QImage поверх буфера fitz.Pixmap без копирования и без промежуточного PNG."""
+        with self._lock:
+            pix = self._document(path)[page_number].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        image = QImage(pix.samples_mv, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888)
+        # QImage не владеет буфером, поэтому pix должен жить столько же, сколько image
+        return image, pix
+
+    def pixmap(self, path, page_number, zoom):
+        key = (path, page_number, zoom)
+        if key in self._pixmaps:
+            self._pixmaps.move_to_end(key)
+            return self._pixmaps[key]
+
+        with self._lock:
+            rendered = self._prefetched.pop(key, None)
+        if rendered is None:
+            rendered = self._render(path, page_number, zoom)
+
+        pixmap = QPixmap.fromImage(rendered[0])
+        self._pixmaps[key] = pixmap
+        while len(self._pixmaps) > self.max_pages:
+            self._pixmaps.popitem(last=False)
+        return pixmap
+
+    def prefetch(self, path, page_numbers, zoom):
+        page_count = self.page_count(path)
+        for page_number in page_numbers:
+            key = (path, page_number, zoom)
+            if not 0 <= page_number < page_count or key in self._pixmaps:
+                continue
+            with self._lock:
+                if key in self._prefetched or key in self._pending:
+                    continue
+                self._pending.add(key)
+            self._executor.submit(self._prefetch, key)
+
+    def _prefetch(self, key):
+        try:
+            rendered = self._render(*key)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+        with self._lock:
+            self._prefetched[key] = rendered
+            while len(self._prefetched) > self.max_pages:
+                self._prefetched.popitem(last=False)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            for doc in self._docs.values():
+                doc.close()
+            self._docs.clear()
+            self._prefetched.clear()
+        self._pixmaps.clear()
+
+
+def _extract_format_two_pass(template_pdf):
+    """Прежний вариант extract_format (pdfplumber + повторное открытие fitz), нужен только для сравнения."""
+    data = {"text": [], "tables": [], "fonts": {}}
+
+    with pdfplumber.open(template_pdf) as pdf:
+        for page in pdf.pages:
+            for word in page.extract_words():
+                data["text"].append({
+                    "text": word["text"],
+                    "x": word["x0"],
+                    "y": page.height - word["top"],
+                    "size": word["height"]
+                })
+            tables = page.extract_tables()
+            if tables:
+                data["tables"].append(tables)
+
+    doc = fitz.open(template_pdf)
+    for page in doc:
+        for block in page.get_text("dict")["blocks"]:
+            for line in block.get("lines", []):
+                for span in line["spans"]:
+                    data["fonts"][span["font"]] = span["size"]
+
+    return data
+
+
+def _peak_rss_mb():
+    """Пиковое потребление памяти текущим процессом в МБ (None, если не поддерживается)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В Linux ru_maxrss в килобайтах, в macOS - в байтах
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _measure_extractor(extractor, template_pdf, queue):
+    start = time.perf_counter()
+    data = extractor(template_pdf)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, _peak_rss_mb(), len(data["text"])))
+
+
+def benchmark_extract_format(template_pdf):
+    """Сравнивает время и пиковую память однопроходного и двухпроходного извлечения.
+
+    Каждый вариант запускается в отдельном процессе, чтобы пиковая память не смешивалась.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for name, extractor in (("two-pass", _extract_format_two_pass), ("single-pass", extract_format)):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_measure_extractor, args=(extractor, template_pdf, queue))
+        proc.start()
+        results[name] = queue.get()
+        proc.join()
+
+    for name, (elapsed, peak_mb, words) in results.items():
+        peak = f"{peak_mb:.1f} МБ" if peak_mb is not None else "н/д"
+        print(f"{name:>12}: {elapsed:.2f} с, пик RSS {peak}, слов {words}")
+    return results
+
+
+def _make_benchmark_pdf(path, pages, words_per_line=8, lines_per_page=40):
+    """Создаёт синтетический PDF с текстом в двух шрифтах для бенчмарков."""
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page(width=612, height=792)
+        for line in range(lines_per_page):
+            fontname = "hebo" if line % 10 == 0 else "helv"
+            words = " ".join(f"w{page_number}_{line}_{i}" for i in range(words_per_line))
+            page.insert_text((50, 50 + line * 17), words, fontname=fontname, fontsize=11)
+    doc.save(path)
+    doc.close()
+
+
+# Во сколько раз время на страницу для большого документа может превышать время для малого
+APPLY_BENCH_MAX_RATIO = 1.5
+# Размеры шаблонов по умолчанию: малый и 500-страничный, на котором виден квадратичный рост
+APPLY_BENCH_SIZES = (10, 500)
+
+
+def benchmark_apply_format(sizes=APPLY_BENCH_SIZES):
+    """Регрессионный бенчмарк apply_format на синтетических шаблонах разного размера.
+
+    Время и размер результата на страницу должны оставаться постоянными при росте
+    числа страниц; квадратичный рост означает возврат перерисовки всего шаблона на каждой странице.
+    Возвращает True, если время на страницу для самого большого документа не больше
+    чем в APPLY_BENCH_MAX_RATIO раз превышает время для самого малого.
+    """
+    per_page = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in sorted(sizes):
+            template_pdf = os.path.join(tmp, f"template{pages}.pdf")
+            input_pdf = os.path.join(tmp, f"input{pages}.pdf")
+            output_pdf = os.path.join(tmp, f"output{pages}.pdf")
+            _make_benchmark_pdf(template_pdf, pages)
+            _make_benchmark_pdf(input_pdf, pages, words_per_line=1, lines_per_page=1)
+
+            template_data = extract_format(template_pdf)
+            start = time.perf_counter()
+            apply_format(input_pdf, output_pdf, template_pdf, template_data=template_data)
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(output_pdf)
+            per_page[pages] = elapsed / pages
+
+            print(f"apply_format, {pages} стр.: {elapsed:.2f} с ({elapsed / pages * 1000:.2f} мс/стр.), "
+                  f"результат {size / 1024:.0f} КБ ({size / pages / 1024:.1f} КБ/стр.)")
+
+    smallest, largest = min(per_page), max(per_page)
+    ratio = per_page[largest] / per_page[smallest]
+    ok = ratio <= APPLY_BENCH_MAX_RATIO
+    print(f"Время на страницу, {largest} стр. / {smallest} стр.: {ratio:.2f} "
+          f"({'в норме' if ok else f'больше {APPLY_BENCH_MAX_RATIO} - рост нелинейный'})")
+    return ok
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--bench":
+        benchmark_extract_format(sys.argv[2])
+        sys.exit()
+    if len(sys.argv) >= 2 and sys.argv[1] == "--bench-apply":
+        sizes = [int(size) for size in sys.argv[2:]] or APPLY_BENCH_SIZES
+        sys.exit(0 if benchmark_apply_format(sizes) else 1)
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
+
+    app = QApplication(sys.argv)
+    window = PDFFormatterApp()
+    window.show()
+    sys.exit(app.exec())
@@ -1,196 +1,873 @@
-import os
-import sys
-import sqlite3
-import tkinter as tk
-from tkinter import ttk, messagebox
-from datetime import datetime, timedelta
-from tkcalendar import DateEntry  # Импортируем виджет календаря
-
-# Автоустановка зависимостей
-def install_dependencies():
-    try:
-        import sqlite3
-        import tkinter
-        from tkcalendar import DateEntry
-    except ImportError:
-        print("Устанавливаю зависимости...")
-        os.system(f"{sys.executable} -m pip install requests beautifulsoup4 tkcalendar")
-        print("Зависимости установлены, перезапустите скрипт.")
-        sys.exit()
-
-install_dependencies()
-
-# Создание базы данных
-def setup_database():
-    conn = sqlite3.connect("plants.db")
-    cursor = conn.cursor()
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS plants (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT UNIQUE,
-        seedling_days INTEGER,
-        vegetation_days INTEGER,
-        flowering_days INTEGER,
-        fruiting_days INTEGER
-    )
-    """)
-
-    conn.commit()
-    conn.close()
-
-# Функция расчёта дат
-def calculate_growth_stages():
-    for row in tree.get_children():
-        values = tree.item(row, "values")
-        plant_name = values[0]
-        planting_date_str = values[1]
-
-        if not planting_date_str:
-            continue
-
-        try:
-            planting_date = datetime.strptime(planting_date_str, "%Y-%m-%d")
-        except ValueError:
-            messagebox.showerror("Ошибка", f"Неверный формат даты для {plant_name} (должно быть YYYY-MM-DD)")
-            return
-
-        conn = sqlite3.connect("plants.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT seedling_days, vegetation_days, flowering_days, fruiting_days FROM plants WHERE name = ?", (plant_name,))
-        plant_data = cursor.fetchone()
-        conn.close()
-
-        if not plant_data:
-            continue
-
-        seedling_days, vegetation_days, flowering_days, fruiting_days = plant_data
-
-        seedling_date = planting_date + timedelta(days=seedling_days)
-        vegetation_date = seedling_date + timedelta(days=vegetation_days)
-        flowering_date = vegetation_date + timedelta(days=flowering_days)
-        fruiting_date = flowering_date + timedelta(days=fruiting_days)
-
-        tree.item(row, values=(plant_name, planting_date_str,
-                               seedling_date.strftime("%Y-%m-%d"),
-                               vegetation_date.strftime("%Y-%m-%d"),
-                               flowering_date.strftime("%Y-%m-%d"),
-                               fruiting_date.strftime("%Y-%m-%d")))
-
-# Добавление нового растения вручную
-def add_new_plant():
-    def save_new_plant():
-        plant_name = entry_name.get()
-        seedling_days = entry_seedling.get()
-        vegetation_days = entry_vegetation.get()
-        flowering_days = entry_flowering.get()
-        fruiting_days = entry_fruiting.get()
-
-        if not plant_name or not seedling_days or not vegetation_days or not flowering_days or not fruiting_days:
-            messagebox.showerror("Ошибка", "Заполните все поля")
-            return
-
-        try:
-            seedling_days = int(seedling_days)
-            vegetation_days = int(vegetation_days)
-            flowering_days = int(flowering_days)
-            fruiting_days = int(fruiting_days)
-        except ValueError:
-            messagebox.showerror("Ошибка", "Все сроки должны быть числами")
-            return
-
-        conn = sqlite3.connect("plants.db")
-        cursor = conn.cursor()
-        cursor.execute("INSERT OR IGNORE INTO plants (name, seedling_days, vegetation_days, flowering_days, fruiting_days) VALUES (?, ?, ?, ?, ?)",
-                       (plant_name, seedling_days, vegetation_days, flowering_days, fruiting_days))
-        conn.commit()
-        conn.close()
-
-        load_plant_list()
-        add_window.destroy()
-        messagebox.showinfo("Успех", f"{plant_name} добавлен в базу")
-
-    add_window = tk.Toplevel(root)
-    add_window.title("Добавить новое растение")
-    add_window.geometry("300x250")
-
-    tk.Label(add_window, text="Название растения:").pack()
-    entry_name = tk.Entry(add_window)
-    entry_name.pack()
-
-    tk.Label(add_window, text="Дни до рассады:").pack()
-    entry_seedling = tk.Entry(add_window)
-    entry_seedling.pack()
-
-    tk.Label(add_window, text="Дни до вегетации:").pack()
-    entry_vegetation = tk.Entry(add_window)
-    entry_vegetation.pack()
-
-    tk.Label(add_window, text="Дни до цветения:").pack()
-    entry_flowering = tk.Entry(add_window)
-    entry_flowering.pack()
-
-    tk.Label(add_window, text="Дни до плодоношения:").pack()
-    entry_fruiting = tk.Entry(add_window)
-    entry_fruiting.pack()
-
-    tk.Button(add_window, text="Сохранить", command=save_new_plant).pack()
-
-# Загрузка списка растений
-def load_plant_list():
-    conn = sqlite3.connect("plants.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM plants")
-    plants = [row[0] for row in cursor.fetchall()]
-    conn.close()
-
-    for row in tree.get_children():
-        tree.delete(row)
-
-    for plant in plants:
-        tree.insert("", "end", values=(plant, "Введите дату", "", "", "", ""))
-
-# Функция для выбора даты
-def select_planting_date(row):
-    def on_date_select():
-        selected_date = cal.get_date()
-        tree.item(row, values=(tree.item(row, "values")[0], selected_date, "", "", "", ""))
-        date_window.destroy()
-
-    date_window = tk.Toplevel(root)
-    date_window.title("Выберите дату посадки")
-    cal = DateEntry(date_window, date_pattern="y-mm-dd")
-    cal.pack(padx=10, pady=10)
-    tk.Button(date_window, text="Выбрать", command=on_date_select).pack()
-
-# Интерфейс
-setup_database()
-root = tk.Tk()
-root.title("Калькулятор роста растений")
-root.geometry("800x400")
-
-# Таблица
-tree = ttk.Treeview(root, columns=("name", "planting_date", "seedling", "vegetation", "flowering", "fruiting"), show="headings")
-tree.heading("name", text="Растение")
-tree.heading("planting_date", text="Дата посадки")
-tree.heading("seedling", text="Дата рассады")
-tree.heading("vegetation", text="Дата вегетации")
-tree.heading("flowering", text="Дата цветения")
-tree.heading("fruiting", text="Дата плодоношения")
-tree.pack(fill="both", expand=True)
-
-# Добавляем кнопку для выбора даты
-tree.bind("<Double-1>", lambda event: select_planting_date(tree.identify_row(event.y)))
-
-# Кнопка расчёта
-btn_calculate = tk.Button(root, text="Рассчитать даты", command=calculate_growth_stages)
-btn_calculate.pack()
-
-# Кнопка добавления нового растения
-btn_add_plant = tk.Button(root, text="Добавить растение", command=add_new_plant)
-btn_add_plant.pack()
-
-# Загрузка данных в таблицу
-load_plant_list()
-
-root.mainloop()
+import os
+import sys
+import csv
+import json
+import argparse
+import bisect
+from contextlib import contextmanager
+from itertools import islice
+import sqlite3
+import tempfile
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from datetime import datetime, timedelta
+import numpy as np
+from tkcalendar import DateEntry  # Импортируем виджет календаря
+
+# Автоустановка зависимостей
+def install_dependencies():
+    try:
+        import sqlite3
+        import tkinter
+        import numpy
+        from tkcalendar import DateEntry
+    except ImportError:
+        print("Устанавливаю зависимости...")
+        os.system(f"{sys.executable} -m pip install requests beautifulsoup4 tkcalendar numpy")
+        print("Зависимости установлены, перезапустите скрипт.")
+        sys.exit()
+
+install_dependencies()
+
+# Файл базы данных
+DB_PATH = "plants.db"
+
+# Стадии роста в порядке наступления
+STAGES = ("seedling", "vegetation", "flowering", "fruiting")
+SCHEDULE_COLUMNS = ("name", "plot", "planting") + STAGES
+STAGE_TITLES = {"seedling": "рассада", "vegetation": "вегетация", "flowering": "цветение", "fruiting": "плодоношение"}
+
+# Поля таблицы plants для импорта и экспорта
+PLANT_FIELDS = ("name",) + tuple(f"{stage}_days" for stage in STAGES)
+# Сколько строк проверяем и записываем за один executemany
+IMPORT_CHUNK_ROWS = 5000
+
+# Сколько посадок пересчитываем за один проход
+RECOMPUTE_CHUNK_ROWS = 50000
+
+# Сколько найденных посадок показываем в окне поиска по датам
+STAGE_SEARCH_LIMIT = 1000
+
+# Сколько строк таблицы держим в Treeview одновременно
+PAGE_SIZE = 100
+
+_connection = None
+# Кэш сроков стадий: название растения -> (рассада, вегетация, цветение, плодоношение)
+_stage_durations = None
+
+# Одно соединение на всё время работы программы
+def get_connection():
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(DB_PATH)
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute("PRAGMA foreign_keys=ON")
+    return _connection
+
+# Сроки стадий для запросов: незаполненный срок (NULL) считается нулём дней
+def _duration_columns(table="plants"):
+    return ", ".join(f"COALESCE({table}.{field}, 0)" for field in PLANT_FIELDS[1:])
+
+# Все сроки стадий одним запросом; кэш сбрасывается при изменении таблицы plants
+def get_stage_durations():
+    global _stage_durations
+    if _stage_durations is None:
+        cursor = get_connection().execute(f"SELECT name, {_duration_columns()} FROM plants")
+        _stage_durations = {row[0]: row[1:] for row in cursor}
+    return _stage_durations
+
+def invalidate_stage_durations():
+    global _stage_durations
+    _stage_durations = None
+
+# Условие "название начинается с prefix" в виде диапазона, чтобы SQLite шёл по индексу name
+def _prefix_range(prefix):
+    if not prefix:
+        return "", ()
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return " AND name >= ? AND name < ?", (prefix, upper)
+
+# Страница названий по ключу: первые limit названий после after.
+# Возвращает (названия, есть_ли_следующая_страница)
+def fetch_plant_page(prefix="", after=None, limit=PAGE_SIZE):
+    where, params = _prefix_range(prefix)
+    cursor = get_connection().execute(
+        f"SELECT name FROM plants WHERE name > ?{where} ORDER BY name LIMIT ?",
+        (after if after is not None else "",) + params + (limit + 1,))
+    names = [row[0] for row in cursor.fetchmany(limit + 1)]
+    return names[:limit], len(names) > limit
+
+# Создание базы данных
+def setup_database():
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS plants (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE,
+        seedling_days INTEGER,
+        vegetation_days INTEGER,
+        flowering_days INTEGER,
+        fruiting_days INTEGER
+    )
+    """)
+    # Поиск и постраничная выборка идут по name; UNIQUE уже даёт индекс, явный - на случай старых баз
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_plants_name ON plants(name)")
+
+    # Посадки с сохранёнными датами стадий; dirty = 1 - даты нужно пересчитать
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS plantings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        plant_id INTEGER NOT NULL REFERENCES plants(id) ON DELETE CASCADE,
+        plot INTEGER NOT NULL DEFAULT 1,
+        planting_date TEXT NOT NULL,
+        seedling_date TEXT,
+        vegetation_date TEXT,
+        flowering_date TEXT,
+        fruiting_date TEXT,
+        dirty INTEGER NOT NULL DEFAULT 1,
+        UNIQUE (plant_id, plot)
+    )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_plantings_dirty ON plantings(dirty) WHERE dirty = 1")
+    # Поиск по датам стадий идёт диапазоном по этим индексам
+    for stage in STAGES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_plantings_{stage} ON plantings({stage}_date)")
+
+    # Изменились сроки сорта - помечаем его посадки к пересчёту
+    changed = " OR ".join(f"OLD.{field} IS NOT NEW.{field}" for field in PLANT_FIELDS[1:])
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS plants_durations_changed
+    AFTER UPDATE OF {", ".join(PLANT_FIELDS[1:])} ON plants
+    WHEN {changed}
+    BEGIN
+        UPDATE plantings SET dirty = 1 WHERE plant_id = NEW.id;
+    END
+    """)
+
+    conn.commit()
+
+# Даты всех стадий за один проход: planting_dates (n,), durations (n, 4) -> (n, 5),
+# столбцы - посадка и стадии из STAGES
+def compute_stage_dates(planting_dates, durations):
+    planting = np.asarray(planting_dates, dtype="datetime64[D]").reshape(-1)
+    offsets = np.zeros((planting.size, len(STAGES) + 1), dtype=np.int64)
+    np.cumsum(np.asarray(durations, dtype=np.int64).reshape(planting.size, len(STAGES)), axis=1, out=offsets[:, 1:])
+    return planting[:, None] + offsets.astype("timedelta64[D]")
+
+# План сезона: каждый сорт x каждая дата посадки x каждая грядка.
+# Возвращает словарь столбцов SCHEDULE_COLUMNS (массивы NumPy одинаковой длины)
+def plan_season(names, planting_dates, plots=1, durations=None):
+    if durations is None:
+        durations = get_stage_durations()
+    missing = [name for name in names if name not in durations]
+    if missing:
+        raise KeyError(f"Нет сроков для растений: {', '.join(missing[:5])}")
+
+    stage_days = np.array([durations[name] for name in names], dtype=np.int64).reshape(len(names), len(STAGES))
+    dates = np.asarray(planting_dates, dtype="datetime64[D]").reshape(-1)
+    per_plant = dates.size * plots
+
+    plant_index = np.repeat(np.arange(len(names)), per_plant)
+    date_index = np.tile(np.repeat(np.arange(dates.size), plots), len(names))
+    stage_dates = compute_stage_dates(dates[date_index], stage_days[plant_index])
+
+    schedule = {
+        "name": np.asarray(names, dtype=object)[plant_index],
+        "plot": np.tile(np.arange(1, plots + 1), len(names) * dates.size),
+    }
+    for column, name in enumerate(SCHEDULE_COLUMNS[2:]):
+        schedule[name] = stage_dates[:, column]
+    return schedule
+
+def write_schedule_csv(schedule, path):
+    columns = [schedule["name"], schedule["plot"]]
+    columns += [np.datetime_as_string(schedule[name], unit="D") for name in SCHEDULE_COLUMNS[2:]]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(SCHEDULE_COLUMNS)
+        writer.writerows(zip(*columns))
+
+def write_schedule_parquet(schedule, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Для записи Parquet установите pyarrow: pip install pyarrow")
+
+    table = pa.table({
+        "name": pa.array(schedule["name"], type=pa.string()),
+        "plot": pa.array(schedule["plot"], type=pa.int32()),
+        **{name: pa.array(schedule[name], type=pa.date32()) for name in SCHEDULE_COLUMNS[2:]},
+    })
+    pq.write_table(table, path)
+
+SCHEDULE_WRITERS = {
+    ".csv": write_schedule_csv,
+    ".parquet": write_schedule_parquet,
+}
+
+# Сохранение плана; формат определяется по расширению файла
+def export_schedule(schedule, path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SCHEDULE_WRITERS:
+        raise ValueError(f"Неподдерживаемый формат: {ext} (доступны {', '.join(SCHEDULE_WRITERS)})")
+    SCHEDULE_WRITERS[ext](schedule, path)
+
+# Дата посадки сорта на грядке; даты стадий станут устаревшими, только если дата поменялась
+def set_planting_date(plant_name, planting_date, plot=1):
+    datetime.strptime(planting_date, "%Y-%m-%d")
+    conn = get_connection()
+    with conn:
+        cursor = conn.execute("""
+        INSERT INTO plantings (plant_id, plot, planting_date)
+        SELECT id, ?, ? FROM plants WHERE name = ?
+        ON CONFLICT(plant_id, plot) DO UPDATE SET
+            dirty = dirty OR planting_date IS NOT excluded.planting_date,
+            planting_date = excluded.planting_date
+        """, (plot, planting_date, plant_name))
+    if not cursor.rowcount:
+        raise KeyError(f"Растение не найдено: {plant_name}")
+
+# Пересчёт только помеченных посадок. Возвращает число пересчитанных строк
+def recompute_dirty_plantings(chunk_rows=RECOMPUTE_CHUNK_ROWS):
+    conn = get_connection()
+    select = f"""
+    SELECT plantings.id, plantings.planting_date, {_duration_columns()}
+    FROM plantings JOIN plants ON plants.id = plantings.plant_id
+    WHERE plantings.dirty = 1 LIMIT ?
+    """
+    update = f"UPDATE plantings SET {', '.join(f'{stage}_date = ?' for stage in STAGES)}, dirty = 0 WHERE id = ?"
+
+    total = 0
+    with conn:
+        while True:
+            rows = conn.execute(select, (chunk_rows,)).fetchall()
+            if not rows:
+                break
+            ids = [row[0] for row in rows]
+            stage_dates = compute_stage_dates([row[1] for row in rows], [row[2:] for row in rows])
+            stage_dates = np.datetime_as_string(stage_dates[:, 1:], unit="D").tolist()
+            conn.executemany(update, (dates + [planting_id] for dates, planting_id in zip(stage_dates, ids)))
+            total += len(rows)
+    return total
+
+# Посадки на грядке plot для перечисленных сортов: название -> (дата посадки, даты стадий или None)
+def fetch_plantings(names, plot=1):
+    result = {}
+    names = list(names)
+    # Ограничение SQLite на число параметров в одном запросе
+    for start in range(0, len(names), 500):
+        chunk = names[start:start + 500]
+        cursor = get_connection().execute(f"""
+        SELECT plants.name, plantings.planting_date, plantings.dirty,
+               {", ".join(f"plantings.{stage}_date" for stage in STAGES)}
+        FROM plantings JOIN plants ON plants.id = plantings.plant_id
+        WHERE plantings.plot = ? AND plants.name IN ({", ".join("?" * len(chunk))})
+        """, (plot, *chunk))
+        for name, planting_date, dirty, *stages in cursor:
+            result[name] = (planting_date, None if dirty else tuple(stages))
+    return result
+
+# Поиск посадок по датам стадии stage в промежутке [start, end] (строки YYYY-MM-DD):
+#   mode="enter"   - стадия наступает в промежутке;
+#   mode="overlap" - стадия идёт хотя бы один день промежутка. Стадия длится от своей даты
+#                    до даты следующей; у плодоношения конец не известен, оно идёт до конца.
+# Возвращает [(растение, грядка, начало стадии, конец стадии или None), ...] по дате начала
+def find_plantings(stage, start, end, mode="enter", limit=None, indexed=True):
+    if stage not in STAGES:
+        raise ValueError(f"Неизвестная стадия: {stage} (доступны {', '.join(STAGES)})")
+    if mode not in ("enter", "overlap"):
+        raise ValueError(f"Неизвестный режим: {mode} (доступны enter, overlap)")
+    start_day = datetime.strptime(start, "%Y-%m-%d")
+    datetime.strptime(end, "%Y-%m-%d")
+
+    recompute_dirty_plantings()
+    conn = get_connection()
+    column = f"plantings.{stage}_date"
+    position = STAGES.index(stage)
+    next_stage = STAGES[position + 1] if position + 1 < len(STAGES) else None
+    end_column = f"plantings.{next_stage}_date" if next_stage else "NULL"
+
+    if mode == "enter":
+        where, params = f"{column} BETWEEN ? AND ?", (start, end)
+    elif next_stage:
+        # Стадия не длиннее самого долгого срока следующей, поэтому её начало ищется
+        # ограниченным диапазоном по индексу, а конец проверяется уже на найденных строках
+        longest = conn.execute(f"SELECT MAX({next_stage}_days) FROM plants").fetchone()[0] or 0
+        lower = (start_day - timedelta(days=longest)).strftime("%Y-%m-%d")
+        where, params = f"{column} > ? AND {column} <= ? AND {end_column} > ?", (lower, end, start)
+    else:
+        where, params = f"{column} <= ?", (end,)
+
+    sql = f"""
+    SELECT plants.name, plantings.plot, {column}, {end_column}
+    FROM plantings{"" if indexed else " NOT INDEXED"} JOIN plants ON plants.id = plantings.plant_id
+    WHERE {where}
+    ORDER BY {column}, plants.name, plantings.plot
+    """
+    if limit is not None:
+        sql += " LIMIT ?"
+        params += (limit,)
+    return conn.execute(sql, params).fetchall()
+
+# Потоковое чтение каталога: CSV с заголовком, JSON Lines (.jsonl) или JSON-массив (.json)
+def _iter_plant_records(path):
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if ext == ".csv":
+            yield from csv.DictReader(f)
+        elif ext == ".jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif ext == ".json":
+            yield from json.load(f)
+        else:
+            raise ValueError(f"Неподдерживаемый формат: {ext} (доступны .csv, .jsonl, .json)")
+
+# Проверка пачки записей; start - номер первой записи пачки (с 1).
+# Возвращает (строки для executemany, [(номер записи, ошибка), ...])
+def _validate_plant_chunk(records, start):
+    rows, errors = [], []
+    for number, record in enumerate(records, start):
+        try:
+            name = str(record.get("name") or "").strip()
+            if not name:
+                raise ValueError("пустое название")
+            days = [int(record[field]) for field in PLANT_FIELDS[1:]]
+            if any(value < 0 for value in days):
+                raise ValueError("отрицательный срок")
+        except KeyError as e:
+            errors.append((number, f"нет поля {e}"))
+        except (ValueError, TypeError, AttributeError) as e:
+            errors.append((number, str(e)))
+        else:
+            rows.append((name, *days))
+    return rows, errors
+
+# Импорт каталога одной транзакцией: существующие сорта обновляются, новые добавляются.
+# Неверные записи пропускаются и возвращаются в errors.
+# Возвращает (загружено строк, ошибки, секунды)
+def import_plants(path, chunk_rows=IMPORT_CHUNK_ROWS):
+    columns = ", ".join(PLANT_FIELDS)
+    updates = ", ".join(f"{field} = excluded.{field}" for field in PLANT_FIELDS[1:])
+    sql = (f"INSERT INTO plants ({columns}) VALUES ({', '.join('?' * len(PLANT_FIELDS))}) "
+           f"ON CONFLICT(name) DO UPDATE SET {updates}")
+
+    conn = get_connection()
+    imported, errors = 0, []
+    start = time.perf_counter()
+    records = _iter_plant_records(path)
+    try:
+        with conn:
+            number = 1
+            while True:
+                chunk = list(islice(records, chunk_rows))
+                if not chunk:
+                    break
+                rows, chunk_errors = _validate_plant_chunk(chunk, number)
+                conn.executemany(sql, rows)
+                imported += len(rows)
+                errors.extend(chunk_errors)
+                number += len(chunk)
+    finally:
+        invalidate_stage_durations()
+    return imported, errors, time.perf_counter() - start
+
+# Экспорт каталога в порядке названий; строки читаются курсором, а не fetchall
+def export_plants(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in (".csv", ".jsonl", ".json"):
+        raise ValueError(f"Неподдерживаемый формат: {ext} (доступны .csv, .jsonl, .json)")
+
+    start = time.perf_counter()
+    cursor = get_connection().execute(f"SELECT {', '.join(PLANT_FIELDS)} FROM plants ORDER BY name")
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if ext == ".csv":
+            writer = csv.writer(f)
+            writer.writerow(PLANT_FIELDS)
+            for row in cursor:
+                writer.writerow(row)
+                count += 1
+        else:
+            if ext == ".json":
+                f.write("[\n")
+            for row in cursor:
+                if ext == ".json" and count:
+                    f.write(",\n")
+                f.write(json.dumps(dict(zip(PLANT_FIELDS, row)), ensure_ascii=False))
+                if ext == ".jsonl":
+                    f.write("\n")
+                count += 1
+            if ext == ".json":
+                f.write("\n]\n")
+    return count, time.perf_counter() - start
+
+def format_rate(count, elapsed):
+    return f"{count} строк за {elapsed:.2f} с ({count / max(elapsed, 1e-9):,.0f} строк/с)"
+
+# Функция расчёта дат: пересчитываются только посадки, у которых поменялась дата или сроки сорта
+def calculate_growth_stages():
+    try:
+        recompute_dirty_plantings()
+    except (ValueError, sqlite3.Error) as e:
+        messagebox.showerror("Ошибка", f"Не удалось рассчитать даты: {e}")
+        return
+    refresh_rows(page_names)
+
+# Добавление нового растения вручную
+def add_new_plant():
+    def save_new_plant():
+        plant_name = entry_name.get()
+        seedling_days = entry_seedling.get()
+        vegetation_days = entry_vegetation.get()
+        flowering_days = entry_flowering.get()
+        fruiting_days = entry_fruiting.get()
+
+        if not plant_name or not seedling_days or not vegetation_days or not flowering_days or not fruiting_days:
+            messagebox.showerror("Ошибка", "Заполните все поля")
+            return
+
+        try:
+            seedling_days = int(seedling_days)
+            vegetation_days = int(vegetation_days)
+            flowering_days = int(flowering_days)
+            fruiting_days = int(fruiting_days)
+        except ValueError:
+            messagebox.showerror("Ошибка", "Все сроки должны быть числами")
+            return
+
+        conn = get_connection()
+        cursor = conn.execute("INSERT OR IGNORE INTO plants (name, seedling_days, vegetation_days, flowering_days, fruiting_days) VALUES (?, ?, ?, ?, ?)",
+                              (plant_name, seedling_days, vegetation_days, flowering_days, fruiting_days))
+        conn.commit()
+        invalidate_stage_durations()
+
+        if cursor.rowcount:
+            show_inserted_plant(plant_name)
+        add_window.destroy()
+        messagebox.showinfo("Успех", f"{plant_name} добавлен в базу")
+
+    add_window = tk.Toplevel(root)
+    add_window.title("Добавить новое растение")
+    add_window.geometry("300x250")
+
+    tk.Label(add_window, text="Название растения:").pack()
+    entry_name = tk.Entry(add_window)
+    entry_name.pack()
+
+    tk.Label(add_window, text="Дни до рассады:").pack()
+    entry_seedling = tk.Entry(add_window)
+    entry_seedling.pack()
+
+    tk.Label(add_window, text="Дни до вегетации:").pack()
+    entry_vegetation = tk.Entry(add_window)
+    entry_vegetation.pack()
+
+    tk.Label(add_window, text="Дни до цветения:").pack()
+    entry_flowering = tk.Entry(add_window)
+    entry_flowering.pack()
+
+    tk.Label(add_window, text="Дни до плодоношения:").pack()
+    entry_fruiting = tk.Entry(add_window)
+    entry_fruiting.pack()
+
+    tk.Button(add_window, text="Сохранить", command=save_new_plant).pack()
+
+# Импорт каталога из файла через интерфейс
+def import_plants_dialog():
+    path = filedialog.askopenfilename(title="Импорт каталога",
+                                      filetypes=[("Каталог", "*.csv *.jsonl *.json"), ("Все файлы", "*.*")])
+    if not path:
+        return
+    try:
+        imported, errors, elapsed = import_plants(path)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        messagebox.showerror("Ошибка", f"Импорт не выполнен: {e}")
+        return
+
+    load_plant_list()
+    message = f"Загружено: {format_rate(imported, elapsed)}"
+    if errors:
+        message += f"\nПропущено записей: {len(errors)}\n" + "\n".join(f"№{number}: {error}" for number, error in errors[:10])
+    messagebox.showinfo("Импорт", message)
+
+def export_plants_dialog():
+    path = filedialog.asksaveasfilename(title="Экспорт каталога", defaultextension=".csv",
+                                        filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("JSON", "*.json")])
+    if not path:
+        return
+    try:
+        count, elapsed = export_plants(path)
+    except (OSError, ValueError) as e:
+        messagebox.showerror("Ошибка", f"Экспорт не выполнен: {e}")
+        return
+    messagebox.showinfo("Экспорт", f"Сохранено: {format_rate(count, elapsed)}")
+
+# Окно поиска посадок по датам стадий
+def open_stage_search():
+    search_window = tk.Toplevel(root)
+    search_window.title("Поиск по датам стадий")
+    search_window.geometry("600x400")
+
+    form = tk.Frame(search_window)
+    form.pack(fill="x", padx=5, pady=5)
+    stage_box = ttk.Combobox(form, state="readonly", width=14, values=[STAGE_TITLES[stage] for stage in STAGES])
+    stage_box.current(STAGES.index("fruiting"))
+    stage_box.pack(side="left")
+    mode_var = tk.StringVar(value="enter")
+    tk.Radiobutton(form, text="наступает", variable=mode_var, value="enter").pack(side="left")
+    tk.Radiobutton(form, text="идёт", variable=mode_var, value="overlap").pack(side="left")
+    tk.Label(form, text="с").pack(side="left")
+    date_from = DateEntry(form, date_pattern="y-mm-dd", width=10)
+    date_from.pack(side="left")
+    tk.Label(form, text="по").pack(side="left")
+    date_to = DateEntry(form, date_pattern="y-mm-dd", width=10)
+    date_to.set_date(date_from.get_date() + timedelta(days=7))
+    date_to.pack(side="left")
+
+    results = ttk.Treeview(search_window, columns=("name", "plot", "start", "end"), show="headings")
+    for column, title in zip(("name", "plot", "start", "end"), ("Растение", "Грядка", "Начало стадии", "Конец стадии")):
+        results.heading(column, text=title)
+    status = tk.Label(search_window, anchor="w")
+
+    def run_search():
+        stage = STAGES[stage_box.current()]
+        start = date_from.get_date().strftime("%Y-%m-%d")
+        end = date_to.get_date().strftime("%Y-%m-%d")
+        began = time.perf_counter()
+        try:
+            rows = find_plantings(stage, start, end, mode_var.get(), limit=STAGE_SEARCH_LIMIT + 1)
+        except (ValueError, sqlite3.Error) as e:
+            messagebox.showerror("Ошибка", f"Поиск не выполнен: {e}", parent=search_window)
+            return
+        elapsed = (time.perf_counter() - began) * 1000
+
+        results.delete(*results.get_children())
+        for name, plot, stage_start, stage_end in rows[:STAGE_SEARCH_LIMIT]:
+            results.insert("", "end", values=(name, plot, stage_start, stage_end or ""))
+        found = f"первые {STAGE_SEARCH_LIMIT}" if len(rows) > STAGE_SEARCH_LIMIT else str(len(rows))
+        status.config(text=f"Найдено: {found} за {elapsed:.1f} мс")
+
+    tk.Button(form, text="Найти", command=run_search).pack(side="left", padx=5)
+    status.pack(fill="x", padx=5)
+    results.pack(fill="both", expand=True)
+
+# Состояние таблицы: названия видимой страницы и их посадки из базы
+page_names = []
+page_history = []
+page_has_next = False
+page_plantings = {}
+
+def row_values(plant_name):
+    planting_date, stages = page_plantings.get(plant_name, ("Введите дату", None))
+    return (plant_name, planting_date) + (stages or ("",) * len(STAGES))
+
+# Перечитать посадки указанных строк страницы и обновить их в Treeview
+def refresh_rows(names):
+    page_plantings.update(fetch_plantings(names))
+    for plant_name in names:
+        tree.item(plant_name, values=row_values(plant_name))
+
+# Показ страницы: в Treeview только её строки, iid строки - название растения
+def show_page(names, has_next):
+    global page_names, page_has_next, page_plantings
+    page_plantings = fetch_plantings(names)
+    tree.delete(*tree.get_children())
+    for plant in names:
+        tree.insert("", "end", iid=plant, values=row_values(plant))
+    page_names = names
+    page_has_next = has_next
+    btn_prev.config(state="normal" if page_history else "disabled")
+    btn_next.config(state="normal" if has_next else "disabled")
+    page_label.config(text=f"{names[0]} — {names[-1]}" if names else "Ничего не найдено")
+
+# Загрузка списка растений: первая страница с учётом строки поиска
+def load_plant_list():
+    page_history.clear()
+    show_page(*fetch_plant_page(search_var.get()))
+
+def next_page():
+    if page_has_next and page_names:
+        page_history.append(page_names[0])
+        show_page(*fetch_plant_page(search_var.get(), after=page_names[-1]))
+
+# Назад: страница снова начинается с запомненного первого названия
+def prev_page():
+    if page_history:
+        start = page_history.pop()
+        names, more = fetch_plant_page(search_var.get(), after=start, limit=PAGE_SIZE - 1)
+        show_page([start] + names, more)
+
+# Поиск перезапускает выборку не на каждую букву, а после паузы в наборе
+_search_job = None
+
+def on_search_changed(*_):
+    global _search_job
+    if _search_job is not None:
+        root.after_cancel(_search_job)
+    _search_job = root.after(200, load_plant_list)
+
+# Новое растение: вставка одной строки на своё место вместо перезагрузки всей таблицы
+def show_inserted_plant(plant_name):
+    global page_has_next
+    if not plant_name.startswith(search_var.get()):
+        return
+    if page_names and plant_name < page_names[0] and page_history:
+        return
+    if page_names and plant_name > page_names[-1] and page_has_next:
+        return
+
+    index = bisect.bisect_left(page_names, plant_name)
+    page_names.insert(index, plant_name)
+    tree.insert("", index, iid=plant_name, values=row_values(plant_name))
+    if len(page_names) > PAGE_SIZE:
+        removed = page_names.pop()
+        page_plantings.pop(removed, None)
+        tree.delete(removed)
+        page_has_next = True
+        btn_next.config(state="normal")
+    tree.see(plant_name)
+
+# Функция для выбора даты
+def select_planting_date(row):
+    if not row:
+        return
+
+    def on_date_select():
+        set_planting_date(row, cal.get_date().strftime("%Y-%m-%d"))
+        refresh_rows([row])
+        date_window.destroy()
+
+    date_window = tk.Toplevel(root)
+    date_window.title("Выберите дату посадки")
+    cal = DateEntry(date_window, date_pattern="y-mm-dd")
+    cal.pack(padx=10, pady=10)
+    tk.Button(date_window, text="Выбрать", command=on_date_select).pack()
+
+# Замеры идут на временной базе, рабочая plants.db не трогается
+@contextmanager
+def _temporary_database():
+    global DB_PATH, _connection
+    saved = DB_PATH, _connection
+    with tempfile.TemporaryDirectory() as tmp:
+        DB_PATH, _connection = os.path.join(tmp, "bench.db"), None
+        invalidate_stage_durations()
+        try:
+            setup_database()
+            yield get_connection()
+        finally:
+            if _connection is not None:
+                _connection.close()
+            DB_PATH, _connection = saved
+            invalidate_stage_durations()
+
+def _fill_catalogue(conn, rows):
+    conn.executemany("INSERT INTO plants (name, seedling_days, vegetation_days, flowering_days, fruiting_days) VALUES (?, ?, ?, ?, ?)",
+                     ((f"Сорт {i}", 10 + i % 20, 30, 20, 40) for i in range(rows)))
+    conn.commit()
+    return [f"Сорт {i}" for i in range(rows)]
+
+# Сравнение прежнего поиска (соединение и запрос на каждую строку) с кэшем сроков
+def benchmark_lookups(rows=10000):
+    with _temporary_database() as conn:
+        names = _fill_catalogue(conn, rows)
+
+        start = time.perf_counter()
+        for name in names:
+            per_row = sqlite3.connect(DB_PATH)
+            per_row.execute("SELECT seedling_days, vegetation_days, flowering_days, fruiting_days FROM plants WHERE name = ?", (name,)).fetchone()
+            per_row.close()
+        old = time.perf_counter() - start
+
+        start = time.perf_counter()
+        durations = get_stage_durations()
+        for name in names:
+            durations.get(name)
+        new = time.perf_counter() - start
+
+    print(f"{rows} строк: соединение на строку {old:.3f} с, кэш сроков {new:.3f} с")
+    return old, new
+
+# Полный пересчёт плана на plots грядок против пересчёта после правки одного сорта
+def _fill_plantings(conn, plots):
+    with conn:
+        conn.execute("""
+        WITH RECURSIVE plot(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM plot WHERE n < ?)
+        INSERT INTO plantings (plant_id, plot, planting_date)
+        SELECT plants.id, plot.n, date('2026-03-01', '+' || ((plants.id * 7 + plot.n * 13) % 730) || ' days') FROM plants, plot
+        """, (plots,))
+
+def benchmark_recompute(rows=10000, plots=5):
+    with _temporary_database() as conn:
+        _fill_catalogue(conn, rows)
+        _fill_plantings(conn, plots)
+
+        start = time.perf_counter()
+        full_rows = recompute_dirty_plantings()
+        full = time.perf_counter() - start
+
+        with conn:
+            conn.execute("UPDATE plants SET fruiting_days = fruiting_days + 1 WHERE name = 'Сорт 1'")
+        start = time.perf_counter()
+        dirty_rows = recompute_dirty_plantings()
+        incremental = time.perf_counter() - start
+
+    print(f"{full_rows} посадок: полный пересчёт {full:.3f} с, "
+          f"после правки одного сорта ({dirty_rows} посадок) {incremental:.4f} с")
+    return full, incremental
+
+# Поиск по индексам дат против полного просмотра таблицы на недельных промежутках
+# (посадки разбросаны по двум сезонам)
+def benchmark_range_queries(rows=10000, plots=5, queries=20):
+    with _temporary_database() as conn:
+        _fill_catalogue(conn, rows)
+        _fill_plantings(conn, plots)
+        recompute_dirty_plantings()
+        conn.execute("ANALYZE")
+
+        first = datetime(2026, 3, 1)
+        windows = [((first + timedelta(days=37 * i)).strftime("%Y-%m-%d"),
+                    (first + timedelta(days=37 * i + 6)).strftime("%Y-%m-%d")) for i in range(queries)]
+        print(f"{rows * plots} посадок, {queries} запросов по неделе:")
+        timings = {}
+        for stage in ("flowering", "fruiting"):
+            for mode in ("enter", "overlap"):
+                if stage == "fruiting" and mode == "overlap":
+                    continue
+                spent = {}
+                for indexed in (True, False):
+                    start = time.perf_counter()
+                    found = [find_plantings(stage, a, b, mode, indexed=indexed) for a, b in windows]
+                    spent[indexed] = (time.perf_counter() - start) * 1000 / queries
+                    if indexed:
+                        expected = found
+                    elif found != expected:
+                        raise AssertionError("результаты поиска по индексу и просмотра различаются")
+                timings[stage, mode] = spent[True], spent[False]
+                hits = sum(map(len, expected)) // queries
+                print(f"  {STAGE_TITLES[stage]} ({mode}): индекс {spent[True]:.2f} мс, "
+                      f"просмотр {spent[False]:.2f} мс, в среднем {hits} строк")
+    return timings
+
+
+# Работа без интерфейса: план сезона в CSV/Parquet и замеры
+def run_cli(argv):
+    parser = argparse.ArgumentParser(description="Калькулятор роста растений")
+    parser.add_argument("--plan", metavar="FILE", help="сохранить план сезона в .csv или .parquet")
+    parser.add_argument("--dates", nargs="+", default=[], help="даты посадки YYYY-MM-DD")
+    parser.add_argument("--plots", type=int, default=1, help="число грядок на каждую посадку")
+    parser.add_argument("--plants", nargs="+", help="растения (по умолчанию - все из базы)")
+    parser.add_argument("--bench", nargs="?", type=int, const=10000, metavar="ROWS",
+                        help="сравнить поиск сроков по строке и через кэш")
+    parser.add_argument("--bench-recompute", nargs="?", type=int, const=10000, metavar="ROWS",
+                        help="сравнить полный и выборочный пересчёт посадок")
+    parser.add_argument("--find", nargs=3, metavar=("STAGE", "FROM", "TO"),
+                        help=f"посадки, у которых стадия ({', '.join(STAGES)}) наступает в промежутке")
+    parser.add_argument("--overlap", action="store_true", help="для --find: стадия идёт в промежутке")
+    parser.add_argument("--bench-range", nargs="?", type=int, const=10000, metavar="ROWS",
+                        help="сравнить поиск по датам с полным просмотром")
+    parser.add_argument("--import", dest="import_path", metavar="FILE", help="загрузить каталог из .csv/.jsonl/.json")
+    parser.add_argument("--export", dest="export_path", metavar="FILE", help="выгрузить каталог в .csv/.jsonl/.json")
+    args = parser.parse_args(argv)
+
+    if args.import_path:
+        setup_database()
+        imported, errors, elapsed = import_plants(args.import_path)
+        print(f"Загружено: {format_rate(imported, elapsed)}")
+        for number, error in errors[:20]:
+            print(f"  запись {number}: {error}")
+        if len(errors) > 20:
+            print(f"  ... ещё ошибок: {len(errors) - 20}")
+    if args.export_path:
+        setup_database()
+        print(f"Сохранено: {format_rate(*export_plants(args.export_path))}")
+    if args.bench:
+        benchmark_lookups(args.bench)
+    if args.bench_recompute:
+        benchmark_recompute(args.bench_recompute)
+    if args.bench_range:
+        benchmark_range_queries(args.bench_range)
+    if args.find:
+        setup_database()
+        stage, start, end = args.find
+        try:
+            found = find_plantings(stage, start, end, "overlap" if args.overlap else "enter")
+        except ValueError as e:
+            parser.error(str(e))
+        for name, plot, stage_start, stage_end in found:
+            print(f"{stage_start} - {stage_end or '...'}\t{name}\tгрядка {plot}")
+    if args.plan:
+        if not args.dates:
+            parser.error("для --plan нужны даты посадки (--dates)")
+        setup_database()
+        names = args.plants or list(get_stage_durations())
+        start = time.perf_counter()
+        schedule = plan_season(names, args.dates, args.plots)
+        export_schedule(schedule, args.plan)
+        print(f"{len(schedule['name'])} строк плана за {time.perf_counter() - start:.3f} с -> {args.plan}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run_cli(sys.argv[1:])
+        sys.exit()
+
+    # Интерфейс
+    setup_database()
+    root = tk.Tk()
+    root.title("Калькулятор роста растений")
+    root.geometry("800x400")
+
+    # Поиск по началу названия
+    search_frame = tk.Frame(root)
+    search_frame.pack(fill="x")
+    tk.Label(search_frame, text="Поиск:").pack(side="left")
+    search_var = tk.StringVar()
+    search_var.trace_add("write", on_search_changed)
+    tk.Entry(search_frame, textvariable=search_var).pack(side="left", fill="x", expand=True)
+
+    # Листание страниц
+    btn_next = tk.Button(search_frame, text="▶", command=next_page)
+    btn_next.pack(side="right")
+    btn_prev = tk.Button(search_frame, text="◀", command=prev_page)
+    btn_prev.pack(side="right")
+    page_label = tk.Label(search_frame)
+    page_label.pack(side="right")
+
+    # Таблица
+    tree = ttk.Treeview(root, columns=("name", "planting_date", "seedling", "vegetation", "flowering", "fruiting"), show="headings")
+    tree.heading("name", text="Растение")
+    tree.heading("planting_date", text="Дата посадки")
+    tree.heading("seedling", text="Дата рассады")
+    tree.heading("vegetation", text="Дата вегетации")
+    tree.heading("flowering", text="Дата цветения")
+    tree.heading("fruiting", text="Дата плодоношения")
+    tree.pack(fill="both", expand=True)
+
+    # Добавляем кнопку для выбора даты
+    tree.bind("<Double-1>", lambda event: select_planting_date(tree.identify_row(event.y)))
+
+    # Кнопка расчёта
+    btn_calculate = tk.Button(root, text="Рассчитать даты", command=calculate_growth_stages)
+    btn_calculate.pack()
+
+    # Кнопка добавления нового растения
+    btn_add_plant = tk.Button(root, text="Добавить растение", command=add_new_plant)
+    btn_add_plant.pack()
+
+    # Импорт и экспорт каталога
+    io_frame = tk.Frame(root)
+    io_frame.pack()
+    tk.Button(io_frame, text="Импорт каталога", command=import_plants_dialog).pack(side="left")
+    tk.Button(io_frame, text="Экспорт каталога", command=export_plants_dialog).pack(side="left")
+    tk.Button(io_frame, text="Поиск по датам", command=open_stage_search).pack(side="left")
+
+    # Загрузка данных в таблицу
+    load_plant_list()
+
+    root.mainloop()
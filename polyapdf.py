@@ -1,104 +1,652 @@
-import fitz  # PyMuPDF
-import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
-
-def get_page_margins(pdf_path):
-    try:
-        # Открываем PDF-документ
-        doc = fitz.open(pdf_path)
-        results = []
-
-        # Перебираем все страницы
-        for page_number in range(len(doc)):
-            page = doc.load_page(page_number)  # Загружаем страницу
-
-            # Получаем размеры страницы в пунктах (1 пункт = 1/72 дюйма)
-            rect = page.rect
-            width_pt = rect.width
-            height_pt = rect.height
-
-            # Конвертируем размеры страницы в миллиметры
-            mm_per_inch = 25.4
-            width_mm = (width_pt / 72) * mm_per_inch
-            height_mm = (height_pt / 72) * mm_per_inch
-
-            # Получаем все элементы страницы (текст, изображения, формы и т.д.)
-            elements = page.get_text("blocks")  # Используем "blocks" для получения всех элементов
-
-            if not elements:
-                results.append(f"Страница {page_number + 1}: Нет элементов.\n")
-                continue
-
-            # Инициализируем минимальные и максимальные координаты
-            x0_min, y0_min = float('inf'), float('inf')
-            x1_max, y1_max = 0, 0
-
-            # Перебираем все элементы и находим границы
-            for element in elements:
-                x0, y0, x1, y1 = element[:4]  # Координаты блока
-                x0_min = min(x0_min, x0)
-                y0_min = min(y0_min, y0)
-                x1_max = max(x1_max, x1)
-                y1_max = max(y1_max, y1)
-
-            # Вычисляем поля в пунктах
-            left_margin_pt = x0_min
-            right_margin_pt = width_pt - x1_max
-            top_margin_pt = y0_min
-            bottom_margin_pt = height_pt - y1_max
-
-            # Конвертируем поля в миллиметры
-            left_margin_mm = (left_margin_pt / 72) * mm_per_inch
-            right_margin_mm = (right_margin_pt / 72) * mm_per_inch
-            top_margin_mm = (top_margin_pt / 72) * mm_per_inch
-            bottom_margin_mm = (bottom_margin_pt / 72) * mm_per_inch
-
-            # Формируем результат для текущей страницы
-            result = (
-                f"Страница {page_number + 1}:\n"
-                f"  Размеры страницы: {width_mm:.2f} мм x {height_mm:.2f} мм\n"
-                f"  Левое поле: {left_margin_mm:.2f} мм\n"
-                f"  Правое поле: {right_margin_mm:.2f} мм\n"
-                f"  Верхнее поле: {top_margin_mm:.2f} мм\n"
-                f"  Нижнее поле: {bottom_margin_mm:.2f} мм\n"
-            )
-            results.append(result)
-
-        # Возвращаем результаты для всех страниц
-        return "\n".join(results)
-
-    except Exception as e:
-        return f"Произошла ошибка: {str(e)}"
-
-def select_pdf():
-    # Открываем диалог выбора файла
-    file_path = filedialog.askopenfilename(
-        title="Выберите PDF-документ",
-        filetypes=[("PDF Files", "*.pdf")]
-    )
-    if file_path:
-        # Анализируем документ
-        result = get_page_margins(file_path)
-        # Выводим результат в текстовое поле
-        result_text.delete(1.0, tk.END)  # Очищаем поле
-        result_text.insert(tk.END, result)  # Вставляем результат
-        # Сохраняем результат в файл
-        with open("margins_results.txt", "w", encoding="utf-8") as file:
-            file.write(result)
-        messagebox.showinfo("Готово", "Результаты сохранены в margins_results.txt")
-
-# Создаем графический интерфейс
-root = tk.Tk()
-root.title("Анализатор полей PDF")
-root.geometry("600x400")
-
-# Кнопка для выбора PDF
-select_button = tk.Button(root, text="Выбрать PDF", command=select_pdf)
-select_button.pack(pady=10)
-
-# Текстовое поле с прокруткой для вывода результатов
-result_text = scrolledtext.ScrolledText(root, wrap=tk.WORD, width=70, height=20)
-result_text.pack(padx=10, pady=10)
-
-# Запуск основного цикла
-root.mainloop()
+import os
+import sys
+import csv
+import json
+import time
+import queue
+import sqlite3
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass, fields
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import fitz  # PyMuPDF
+import tkinter as tk
+from tkinter import filedialog, messagebox, scrolledtext
+
+MM_PER_INCH = 25.4
+# Коэффициент перевода пунктов (1/72 дюйма) в миллиметры
+MM_PER_PT = MM_PER_INCH / 72
+
+# Размер диапазона страниц, который обрабатывает один процесс
+PAGES_PER_CHUNK = 200
+
+# Поля в порядке столбцов массива полей
+MARGIN_SIDES = ("left", "right", "top", "bottom")
+MARGIN_SIDE_NAMES = {"left": "Левое поле", "right": "Правое поле", "top": "Верхнее поле", "bottom": "Нижнее поле"}
+
+# Минимальное отклонение от медианы (мм), начиная с которого страница считается выбивающейся
+OUTLIER_TOLERANCE_MM = 1.0
+
+# Сколько страниц записывается в одну группу строк Parquet
+PARQUET_BATCH_PAGES = 10000
+
+# Режимы поиска границ содержимого: по текстовым блокам или по отрендеренным пикселям (для сканов)
+MODES = ("text", "raster")
+# Разрешение рендеринга и порог яркости (0-255), ниже которого пиксель считается краской
+RASTER_DPI = 50
+RASTER_INK_THRESHOLD = 200
+
+# Кэш результатов пакетного режима
+CACHE_DB = "margins_cache.db"
+# Версия схемы кэша (PRAGMA user_version): 1 - результаты только по хэшу, 2 - по хэшу и режиму
+CACHE_SCHEMA_VERSION = 2
+
+
+@dataclass(slots=True)
+class PageMargins:
+    """Поля одной страницы в мм; у страниц без элементов поля равны None."""
+    page: int
+    width_mm: float
+    height_mm: float
+    left_mm: float | None
+    right_mm: float | None
+    top_mm: float | None
+    bottom_mm: float | None
+
+    @property
+    def is_empty(self):
+        return self.left_mm is None
+
+    def as_row(self):
+        return (self.page, self.width_mm, self.height_mm, self.left_mm, self.right_mm, self.top_mm, self.bottom_mm)
+
+
+PAGE_MARGIN_FIELDS = [field.name for field in fields(PageMargins)]
+
+
+def _range_margins(doc, start, stop):
+    """Считает поля страниц start..stop-1 одной векторной операцией.
+
+    Координаты всех блоков диапазона собираются в один массив, после чего
+    минимумы и максимумы по страницам находятся через reduceat. Возвращает
+    массивы номеров страниц (с 1), размеров страниц (n, 2) и полей
+    (n, 4: левое, правое, верхнее, нижнее) в мм; у пустых страниц поля - NaN.
+    """
+    page_sizes = np.empty((stop - start, 2))
+    counts = np.zeros(stop - start, dtype=np.intp)
+    coords = []
+    for i, page_number in enumerate(range(start, stop)):
+        page = doc.load_page(page_number)
+        page_sizes[i] = page.rect.width, page.rect.height
+        # Получаем все элементы страницы (текст, изображения, формы и т.д.)
+        blocks = page.get_text("blocks")
+        counts[i] = len(blocks)
+        coords.extend(block[:4] for block in blocks)
+
+    margins = np.full((stop - start, 4), np.nan)
+    has_blocks = counts > 0
+    if coords:
+        coords = np.asarray(coords, dtype=float)
+        offsets = (np.cumsum(counts) - counts)[has_blocks]
+        mins = np.minimum.reduceat(coords[:, :2], offsets, axis=0)
+        maxs = np.maximum.reduceat(coords[:, 2:], offsets, axis=0)
+        sizes = page_sizes[has_blocks]
+        margins[has_blocks] = np.column_stack((
+            mins[:, 0],
+            sizes[:, 0] - maxs[:, 0],
+            mins[:, 1],
+            sizes[:, 1] - maxs[:, 1],
+        ))
+
+    pages = np.arange(start + 1, stop + 1)
+    return pages, page_sizes * MM_PER_PT, margins * MM_PER_PT
+
+
+def _range_margins_raster(pdf_path, start, stop, threads=None, dpi=RASTER_DPI, threshold=RASTER_INK_THRESHOLD):
+    """То же, что _range_margins, но границы содержимого ищутся по отрендеренной странице.
+
+    Страница рендерится в оттенках серого с низким разрешением, и рамка всех
+    пикселей темнее threshold находится векторно по буферу pixmap. Так
+    учитываются сканы без текстового слоя, рисунки и изображения. Страницы
+    рендерятся в пуле потоков, у каждого потока свой дескриптор fitz.
+    """
+    local = threading.local()
+    opened = []
+    lock = threading.Lock()
+
+    def ink_box(page_number):
+        doc = getattr(local, "doc", None)
+        if doc is None:
+            doc = local.doc = fitz.open(pdf_path)
+            with lock:
+                opened.append(doc)
+        page = doc.load_page(page_number)
+        width, height = page.rect.width, page.rect.height
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        pixels = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+        ink = pixels < threshold
+        rows = np.flatnonzero(ink.any(axis=1))
+        if not rows.size:
+            return width, height, (np.nan, np.nan, np.nan, np.nan)
+        cols = np.flatnonzero(ink.any(axis=0))
+        scale_x, scale_y = width / pix.width, height / pix.height
+        return width, height, (
+            cols[0] * scale_x,
+            width - (cols[-1] + 1) * scale_x,
+            rows[0] * scale_y,
+            height - (rows[-1] + 1) * scale_y,
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=threads or os.cpu_count() or 1) as pool:
+            boxes = list(pool.map(ink_box, range(start, stop)))
+    finally:
+        for doc in opened:
+            doc.close()
+
+    page_sizes = np.array([box[:2] for box in boxes], dtype=float).reshape(-1, 2)
+    margins = np.array([box[2] for box in boxes], dtype=float).reshape(-1, 4)
+    pages = np.arange(start + 1, stop + 1)
+    return pages, page_sizes * MM_PER_PT, margins * MM_PER_PT
+
+
+def _margins_for_range(pdf_path, start, stop, mode="text", threads=1):
+    """Обрабатывает диапазон страниц в отдельном процессе со своим дескриптором fitz."""
+    if mode == "raster":
+        return _range_margins_raster(pdf_path, start, stop, threads)
+    with fitz.open(pdf_path) as doc:
+        return _range_margins(doc, start, stop)
+
+
+def iter_margin_chunks(pdf_path, workers=None, chunk_size=PAGES_PER_CHUNK, mode="text"):
+    """Выдаёт результаты _range_margins (или _range_margins_raster) по диапазонам страниц, по порядку.
+
+    Небольшие документы обрабатываются в текущем процессе. Большие делятся на
+    диапазоны по chunk_size страниц, которые считаются в пуле процессов.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Неизвестный режим {mode}, поддерживаются: {', '.join(MODES)}")
+
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+        ranges = [(start, min(start + chunk_size, page_count)) for start in range(0, page_count, chunk_size)]
+        if len(ranges) <= 1 or workers == 1:
+            for start, stop in ranges:
+                if mode == "raster":
+                    yield _range_margins_raster(pdf_path, start, stop, threads=workers)
+                else:
+                    yield _range_margins(doc, start, stop)
+            return
+
+    workers = min(workers or os.cpu_count() or 1, len(ranges))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_margins_for_range, pdf_path, start, stop, mode) for start, stop in ranges]
+        for future in futures:
+            yield future.result()
+
+
+def iter_page_margins(pdf_path, workers=None, chunk_size=PAGES_PER_CHUNK, mode="text"):
+    """Выдаёт записи PageMargins по мере их вычисления."""
+    for pages, sizes, margins in iter_margin_chunks(pdf_path, workers, chunk_size, mode):
+        for page, (width, height), side in zip(pages.tolist(), sizes.tolist(), margins.tolist()):
+            if side[0] != side[0]:  # NaN - на странице нет элементов
+                side = (None, None, None, None)
+            yield PageMargins(page, width, height, *side)
+
+
+def document_margins(pdf_path, workers=None, chunk_size=PAGES_PER_CHUNK, mode="text"):
+    """Возвращает массивы номеров страниц, размеров и полей для всего документа."""
+    chunks = list(iter_margin_chunks(pdf_path, workers, chunk_size, mode))
+    if not chunks:
+        return np.empty(0, dtype=int), np.empty((0, 2)), np.empty((0, 4))
+    pages, sizes, margins = zip(*chunks)
+    return np.concatenate(pages), np.concatenate(sizes), np.concatenate(margins)
+
+
+def margin_statistics(pages, margins, percentiles=(5, 50, 95), tolerance_mm=OUTLIER_TOLERANCE_MM):
+    """Сводная статистика полей по документу.
+
+    Для каждого поля считаются медиана и перцентили (пустые страницы не
+    учитываются). Выбивающимися считаются страницы, у которых хотя бы одно поле
+    отличается от медианы больше, чем на max(tolerance_mm, 3 * MAD).
+    """
+    filled = ~np.isnan(margins).any(axis=1)
+    stats = {"pages": len(pages), "empty_pages": pages[~filled].tolist(), "sides": {}, "outliers": []}
+    if not filled.any():
+        return stats
+
+    values = margins[filled]
+    median = np.median(values, axis=0)
+    mad = np.median(np.abs(values - median), axis=0)
+    limit = np.maximum(tolerance_mm, 3 * mad)
+    for i, side in enumerate(MARGIN_SIDES):
+        stats["sides"][side] = {
+            "median": float(median[i]),
+            "percentiles": dict(zip(percentiles, np.percentile(values[:, i], percentiles).tolist())),
+        }
+
+    outliers = (np.abs(values - median) > limit).any(axis=1)
+    stats["outliers"] = pages[filled][outliers].tolist()
+    return stats
+
+
+def format_margin_statistics(stats):
+    """Формирует текстовую сводку по документу."""
+    lines = [f"Итого страниц: {stats['pages']}, пустых: {len(stats['empty_pages'])}"]
+    for side, side_stats in stats["sides"].items():
+        percentiles = ", ".join(f"p{p}: {v:.2f}" for p, v in side_stats["percentiles"].items())
+        lines.append(f"  {MARGIN_SIDE_NAMES[side]}: медиана {side_stats['median']:.2f} мм ({percentiles})")
+    if stats["outliers"]:
+        lines.append("  Страницы с нестандартными полями: " + ", ".join(map(str, stats["outliers"])))
+    return "\n".join(lines) + "\n"
+
+
+def format_margin_record(record):
+    """Формирует текстовый отчёт по одной странице."""
+    if record.is_empty:
+        return f"Страница {record.page}: Нет элементов.\n"
+    return (
+        f"Страница {record.page}:\n"
+        f"  Размеры страницы: {record.width_mm:.2f} мм x {record.height_mm:.2f} мм\n"
+        f"  Левое поле: {record.left_mm:.2f} мм\n"
+        f"  Правое поле: {record.right_mm:.2f} мм\n"
+        f"  Верхнее поле: {record.top_mm:.2f} мм\n"
+        f"  Нижнее поле: {record.bottom_mm:.2f} мм\n"
+    )
+
+
+# Писатели результатов. Каждый принимает итерируемые записи PageMargins и файл,
+# пишет записи по мере поступления и возвращает число записанных страниц.
+
+def write_text(records, path):
+    """Текстовый отчёт в прежнем формате."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            if count:
+                f.write("\n")
+            f.write(format_margin_record(record))
+            count += 1
+    return count
+
+
+def write_csv(records, path):
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(PAGE_MARGIN_FIELDS)
+        for record in records:
+            writer.writerow(["" if value is None else value for value in record.as_row()])
+            count += 1
+    return count
+
+
+def write_jsonl(records, path):
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(dict(zip(PAGE_MARGIN_FIELDS, record.as_row()))))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def write_parquet(records, path, batch_pages=PARQUET_BATCH_PAGES):
+    """Parquet через pyarrow; записи пишутся группами строк по batch_pages страниц."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Для записи Parquet установите pyarrow: pip install pyarrow")
+
+    schema = pa.schema([("page", pa.int32())] + [(name, pa.float64()) for name in PAGE_MARGIN_FIELDS[1:]])
+    records = iter(records)
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        while batch := list(islice(records, batch_pages)):
+            columns = list(zip(*(record.as_row() for record in batch)))
+            writer.write_table(pa.Table.from_arrays([pa.array(column, type=field.type)
+                                                     for column, field in zip(columns, schema)], schema=schema))
+            count += len(batch)
+    return count
+
+
+WRITERS = {
+    ".txt": write_text,
+    ".csv": write_csv,
+    ".jsonl": write_jsonl,
+    ".parquet": write_parquet,
+}
+
+
+def export_margins(pdf_path, output_path, workers=None, mode="text"):
+    """Анализирует документ и сразу пишет результат в файл; формат определяется по расширению."""
+    ext = os.path.splitext(output_path)[1].lower()
+    if ext not in WRITERS:
+        raise ValueError(f"Неизвестный формат {ext}, поддерживаются: {', '.join(WRITERS)}")
+    return WRITERS[ext](iter_page_margins(pdf_path, workers, mode=mode), output_path)
+
+
+def _file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 содержимого файла, читается блоками."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _migrate_cache(conn):
+    """Переводит кэш старой схемы на текущую; старые результаты считались в режиме text."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= CACHE_SCHEMA_VERSION:
+        return
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(results)")]
+    with conn:
+        if columns and "mode" not in columns:
+            conn.execute("ALTER TABLE results RENAME TO results_v1")
+            conn.execute("""
+            CREATE TABLE results (
+                sha256 TEXT,
+                mode TEXT,
+                rows TEXT,
+                PRIMARY KEY (sha256, mode)
+            )
+            """)
+            conn.execute("INSERT INTO results (sha256, mode, rows) SELECT sha256, 'text', rows FROM results_v1")
+            conn.execute("DROP TABLE results_v1")
+        conn.execute(f"PRAGMA user_version = {CACHE_SCHEMA_VERSION}")
+
+
+def open_cache(cache_path=CACHE_DB):
+    conn = sqlite3.connect(cache_path)
+    _migrate_cache(conn)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS results (
+        sha256 TEXT,
+        mode TEXT,
+        rows TEXT,
+        PRIMARY KEY (sha256, mode)
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        mtime REAL,
+        size INTEGER,
+        sha256 TEXT
+    )
+    """)
+    return conn
+
+
+def known_hash(conn, path, stat):
+    """Хэш файла из кэша, если путь, время изменения и размер совпадают с сохранёнными, иначе None."""
+    row = conn.execute("SELECT sha256 FROM files WHERE path = ? AND mtime = ? AND size = ?",
+                       (path, stat.st_mtime, stat.st_size)).fetchone()
+    return row[0] if row else None
+
+
+def remember_hash(conn, path, stat, sha256):
+    conn.execute("INSERT OR REPLACE INTO files (path, mtime, size, sha256) VALUES (?, ?, ?, ?)",
+                 (path, stat.st_mtime, stat.st_size, sha256))
+
+
+def cached_result(conn, sha256, mode="text"):
+    """Строки результата по хэшу содержимого или None, если их нет.
+
+    Поиск идёт по хэшу, так что переименованный или скопированный файл тоже берётся из кэша.
+    """
+    result = conn.execute("SELECT rows FROM results WHERE sha256 = ? AND mode = ?", (sha256, mode)).fetchone()
+    return json.loads(result[0]) if result else None
+
+
+def store_rows(conn, sha256, rows, mode="text"):
+    conn.execute("INSERT OR REPLACE INTO results (sha256, mode, rows) VALUES (?, ?, ?)", (sha256, mode, json.dumps(rows)))
+
+
+def _analyse_file(pdf_path, mode="text"):
+    """Анализирует один файл пакета; пул уже распараллелен по файлам, поэтому здесь без вложенного пула."""
+    return [record.as_row() for record in iter_page_margins(pdf_path, workers=1, mode=mode)]
+
+
+def analyse_folder(folder, output_dir=None, ext=".csv", workers=None, cache_path=CACHE_DB, progress=None, mode="text"):
+    """Пакетный режим: анализирует все PDF в папке и пишет отчёт по каждому файлу.
+
+    Файлы, результат для которых уже есть в кэше, не разбираются. Хэши новых и
+    изменённых файлов считаются, а сами файлы анализируются параллельно в пуле
+    процессов. Ошибка в одном файле (в том числе недоступный или исчезнувший
+    файл и незаписанный отчёт) не останавливает пакет. Возвращает список
+    словарей с полями path, pages, cached, error.
+    """
+    output_dir = output_dir or folder
+    os.makedirs(output_dir, exist_ok=True)
+    pdf_paths = sorted(entry.path for entry in os.scandir(folder)
+                       if entry.is_file() and entry.name.lower().endswith(".pdf"))
+    results = []
+
+    def finish(pdf_path, rows, cached, error=None):
+        if rows is not None:
+            stem = os.path.splitext(os.path.basename(pdf_path))[0]
+            try:
+                WRITERS[ext]((PageMargins(*row) for row in rows), os.path.join(output_dir, f"{stem}_margins{ext}"))
+            except Exception as e:
+                # Отчёт не записан (нет прав, нет места, нет pyarrow) - это ошибка файла, а не всего пакета
+                error = f"не удалось записать отчёт: {e}"
+        result = {"path": pdf_path, "pages": len(rows or ()), "cached": cached, "error": error}
+        results.append(result)
+        if progress:
+            progress(len(results), len(pdf_paths), result)
+
+    if not pdf_paths:
+        return results
+
+    conn = open_cache(cache_path)
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(pdf_paths))) as pool:
+            # future -> (этап, путь, данные этапа): для "hash" - stat файла, для "analyse" - хэш
+            futures = {}
+
+            def analyse(pdf_path, sha256):
+                futures[pool.submit(_analyse_file, pdf_path, mode)] = ("analyse", pdf_path, sha256)
+
+            def use_cache_or_analyse(pdf_path, sha256):
+                rows = cached_result(conn, sha256, mode)
+                if rows is None:
+                    analyse(pdf_path, sha256)
+                else:
+                    finish(pdf_path, rows, cached=True)
+
+            for pdf_path in pdf_paths:
+                try:
+                    stat = os.stat(pdf_path)
+                except OSError as e:
+                    finish(pdf_path, None, cached=False, error=str(e))
+                    continue
+                sha256 = known_hash(conn, pdf_path, stat)
+                if sha256 is None:
+                    futures[pool.submit(_file_hash, pdf_path)] = ("hash", pdf_path, stat)
+                else:
+                    use_cache_or_analyse(pdf_path, sha256)
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, pdf_path, data = futures.pop(future)
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        finish(pdf_path, None, cached=False, error=str(e))
+                        continue
+                    if stage == "hash":
+                        remember_hash(conn, pdf_path, data, value)
+                        conn.commit()
+                        use_cache_or_analyse(pdf_path, value)
+                    else:
+                        store_rows(conn, data, value, mode)
+                        conn.commit()
+                        finish(pdf_path, value, cached=False)
+    finally:
+        conn.close()
+    return results
+
+
+def benchmark_modes(pdf_path, workers=None):
+    """Сравнивает режимы text и raster по времени и по расхождению найденных полей.
+
+    Расхождение считается только по страницам, где оба режима нашли содержимое;
+    отдельно выводится число страниц, которые нашёл только растровый режим (сканы).
+    """
+    results = {}
+    for mode in MODES:
+        start = time.perf_counter()
+        pages, _, margins = document_margins(pdf_path, workers, mode=mode)
+        elapsed = time.perf_counter() - start
+        results[mode] = margins
+        print(f"{mode:>6}: {elapsed:.2f} с ({elapsed / max(len(pages), 1) * 1000:.2f} мс/стр.)")
+
+    text, raster = results["text"], results["raster"]
+    both = ~np.isnan(text).any(axis=1) & ~np.isnan(raster).any(axis=1)
+    only_raster = np.isnan(text).any(axis=1) & ~np.isnan(raster).any(axis=1)
+    if both.any():
+        diff = np.abs(text[both] - raster[both])
+        print(f"Расхождение полей, мм: среднее {diff.mean():.2f}, медиана {np.median(diff):.2f}, макс. {diff.max():.2f}")
+    print(f"Страниц с содержимым только по изображению: {int(only_raster.sum())}")
+    return results
+
+
+def run_cli(argv):
+    parser = argparse.ArgumentParser(description="Пакетный анализ полей PDF в папке")
+    parser.add_argument("folder", nargs="?", help="папка с PDF")
+    parser.add_argument("--output-dir", help="папка для отчётов (по умолчанию - та же папка)")
+    parser.add_argument("--format", choices=[ext[1:] for ext in WRITERS], default="csv", help="формат отчётов")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию - число ядер)")
+    parser.add_argument("--cache", default=CACHE_DB, help="файл кэша SQLite")
+    parser.add_argument("--mode", choices=MODES, default="text",
+                        help="text - по текстовым блокам, raster - по отрендеренной странице (сканы)")
+    parser.add_argument("--bench", metavar="PDF", help="сравнить режимы text и raster на одном файле")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        benchmark_modes(args.bench, args.workers)
+        return 0
+    if not args.folder:
+        parser.error("укажите папку с PDF")
+
+    def report(done, total, result):
+        name = os.path.basename(result["path"])
+        if result["error"]:
+            status = f"ошибка - {result['error']}"
+        else:
+            status = f"{result['pages']} стр." + (" (из кэша)" if result["cached"] else "")
+        print(f"[{done}/{total}] {name}: {status}")
+
+    start = time.perf_counter()
+    results = analyse_folder(args.folder, args.output_dir, "." + args.format, args.workers, args.cache, report, args.mode)
+    failed = sum(1 for result in results if result["error"])
+    cached = sum(1 for result in results if result["cached"])
+    print(f"Файлов: {len(results)}, из кэша: {cached}, ошибок: {failed}, время: {time.perf_counter() - start:.2f} с")
+    return 1 if failed else 0
+
+
+def get_page_margins(pdf_path):
+    try:
+        return "\n".join(format_margin_record(record) for record in iter_page_margins(pdf_path))
+    except Exception as e:
+        return f"Произошла ошибка: {str(e)}"
+
+
+def _analyse_in_background(file_path, results, mode):
+    """Считает поля в фоновом потоке и складывает готовые записи в очередь для интерфейса."""
+    try:
+        for record in iter_page_margins(file_path, mode=mode):
+            results.put(("record", record))
+        results.put(("done", None))
+    except Exception as e:
+        results.put(("error", str(e)))
+
+
+def select_pdf():
+    # Открываем диалог выбора файла
+    file_path = filedialog.askopenfilename(
+        title="Выберите PDF-документ",
+        filetypes=[("PDF Files", "*.pdf")]
+    )
+    if not file_path:
+        return
+
+    result_text.delete(1.0, tk.END)  # Очищаем поле
+    select_button.config(state=tk.DISABLED)
+
+    # Результаты дописываются в файл и в текстовое поле по мере готовности страниц
+    output = open("margins_results.txt", "w", encoding="utf-8")
+    results = queue.Queue()
+    mode = "raster" if raster_mode.get() else "text"
+    threading.Thread(target=_analyse_in_background, args=(file_path, results, mode), daemon=True).start()
+
+    first = True
+    pages, margins = [], []
+
+    def poll():
+        nonlocal first
+        try:
+            while True:
+                kind, payload = results.get_nowait()
+                if kind == "record":
+                    text = format_margin_record(payload)
+                    if not first:
+                        text = "\n" + text
+                    first = False
+                    result_text.insert(tk.END, text)
+                    output.write(text)
+                    pages.append(payload.page)
+                    margins.append([np.nan if value is None else value for value in payload.as_row()[3:]])
+                    continue
+
+                if kind == "done" and pages:
+                    # Сводка по документу добавляется в конец отчёта
+                    stats = margin_statistics(np.array(pages), np.array(margins))
+                    text = "\n" + format_margin_statistics(stats)
+                    result_text.insert(tk.END, text)
+                    output.write(text)
+                output.close()
+                select_button.config(state=tk.NORMAL)
+                if kind == "done":
+                    messagebox.showinfo("Готово", "Результаты сохранены в margins_results.txt")
+                else:
+                    result_text.insert(tk.END, f"Произошла ошибка: {payload}")
+                    messagebox.showerror("Ошибка", payload)
+                return
+        except queue.Empty:
+            pass
+        root.after(50, poll)
+
+    poll()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
+
+    # Создаем графический интерфейс
+    root = tk.Tk()
+    root.title("Анализатор полей PDF")
+    root.geometry("600x400")
+
+    # Кнопка для выбора PDF
+    select_button = tk.Button(root, text="Выбрать PDF", command=select_pdf)
+    select_button.pack(pady=10)
+
+    # Режим для сканов без текстового слоя
+    raster_mode = tk.BooleanVar(value=False)
+    tk.Checkbutton(root, text="Искать поля по изображению страницы (сканы)", variable=raster_mode).pack()
+
+    # Текстовое поле с прокруткой для вывода результатов
+    result_text = scrolledtext.ScrolledText(root, wrap=tk.WORD, width=70, height=20)
+    result_text.pack(padx=10, pady=10)
+
+    # Запуск основного цикла
+    root.mainloop()
@@ -1,29 +1,29 @@
-import winreg
-
-def get_installed_programs():
-    programs = []
-    registry_paths = [
-        r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
-        r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
-    ]
-    
-    for reg_path in registry_paths:
-        try:
-            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, reg_path) as key:
-                for i in range(winreg.QueryInfoKey(key)[0]):
-                    try:
-                        sub_key_name = winreg.EnumKey(key, i)
-                        with winreg.OpenKey(key, sub_key_name) as sub_key:
-                            name, _ = winreg.QueryValueEx(sub_key, "DisplayName")
-                            programs.append(name)
-                    except FileNotFoundError:
-                        continue
-                    except OSError:
-                        continue
-        except FileNotFoundError:
-            continue
-
-    return programs
-
-installed_programs = get_installed_programs()
-print(f"Количество установленных программ: {len(installed_programs)}")
+import winreg
+
+def get_installed_programs():
+    programs = []
+    registry_paths = [
+        r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
+        r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
+    ]
+    
+    for reg_path in registry_paths:
+        try:
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, reg_path) as key:
+                for i in range(winreg.QueryInfoKey(key)[0]):
+                    try:
+                        sub_key_name = winreg.EnumKey(key, i)
+                        with winreg.OpenKey(key, sub_key_name) as sub_key:
+                            name, _ = winreg.QueryValueEx(sub_key, "DisplayName")
+                            programs.append(name)
+                    except FileNotFoundError:
+                        continue
+                    except OSError:
+                        continue
+        except FileNotFoundError:
+            continue
+
+    return programs
+
+installed_programs = get_installed_programs()
+print(f"Количество установленных программ: {len(installed_programs)}")
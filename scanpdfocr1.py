@@ -1,120 +1,799 @@
-import sys
-import os
-from PyQt6.QtWidgets import (QApplication, QWidget, QPushButton, QFileDialog, QVBoxLayout,
-                             QProgressBar, QLabel, QTabWidget, QComboBox)
-from PyQt6.QtGui import QPixmap
-from pdf2docx import Converter
-from PIL import Image
-import pytesseract
-
-class PDFScannerConverter(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.initUI()
-
-    def initUI(self):
-        self.setWindowTitle("Сканер и Конвертер PDF")
-        self.setGeometry(100, 100, 800, 600)
-
-        self.tabs = QTabWidget(self)
-
-        # Вкладка сканера
-        self.scan_tab = QWidget()
-        self.initScanTab()
-        self.tabs.addTab(self.scan_tab, "Сканировать")
-
-        # Вкладка конвертера
-        self.convert_tab = QWidget()
-        self.initConvertTab()
-        self.tabs.addTab(self.convert_tab, "Конвертер PDF")
-
-        layout = QVBoxLayout()
-        layout.addWidget(self.tabs)
-        self.setLayout(layout)
-
-    def initScanTab(self):
-        layout = QVBoxLayout()
-
-        self.scan_button = QPushButton("Сканировать и сохранить")
-        self.scan_button.clicked.connect(self.scan_and_save)
-        layout.addWidget(self.scan_button)
-
-        self.save_path_label = QLabel("Путь сохранения: Не выбрано")
-        layout.addWidget(self.save_path_label)
-
-        self.save_path_button = QPushButton("Выбрать путь сохранения")
-        self.save_path_button.clicked.connect(self.select_save_path)
-        layout.addWidget(self.save_path_button)
-
-        self.format_label = QLabel("Формат сохранения:")
-        layout.addWidget(self.format_label)
-
-        self.format_combo = QComboBox()
-        self.format_combo.addItems(["PDF", "DOCX"])
-        layout.addWidget(self.format_combo)
-
-        self.progress_bar = QProgressBar()
-        layout.addWidget(self.progress_bar)
-
-        self.scan_tab.setLayout(layout)
-
-    def initConvertTab(self):
-        layout = QVBoxLayout()
-
-        self.file_select_button = QPushButton("Выбрать PDF файл")
-        self.file_select_button.clicked.connect(self.select_pdf_file)
-        layout.addWidget(self.file_select_button)
-
-        self.convert_button = QPushButton("Конвертировать в DOCX")
-        self.convert_button.clicked.connect(self.convert_pdf_to_docx)
-        layout.addWidget(self.convert_button)
-
-        self.progress_bar_convert = QProgressBar()
-        layout.addWidget(self.progress_bar_convert)
-
-        self.convert_tab.setLayout(layout)
-
-    def select_save_path(self):
-        folder = QFileDialog.getExistingDirectory(self, "Выбрать папку для сохранения")
-        if folder:
-            self.save_path_label.setText(f"Путь сохранения: {folder}")
-            self.save_path = folder
-
-    def scan_and_save(self):
-        # Заглушка для сканирования
-        self.progress_bar.setValue(50)
-        format_selected = self.format_combo.currentText()
-        save_path = self.save_path if hasattr(self, 'save_path') else os.getcwd()
-        output_file = os.path.join(save_path, f"scan_result.{format_selected.lower()}")
-
-        if format_selected == "PDF":
-            image = Image.new('RGB', (200, 200), color='white')
-            image.save(output_file, "PDF")
-        elif format_selected == "DOCX":
-            from docx import Document
-            doc = Document()
-            doc.add_paragraph("Распознанный текст")
-            doc.save(output_file)
-
-        self.progress_bar.setValue(100)
-
-    def select_pdf_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Выбрать PDF файл", "", "PDF Files (*.pdf)")
-        if file_path:
-            self.selected_pdf = file_path
-
-    def convert_pdf_to_docx(self):
-        if hasattr(self, 'selected_pdf'):
-            save_path, _ = QFileDialog.getSaveFileName(self, "Сохранить DOCX", "", "Word Document (*.docx)")
-            if save_path:
-                self.progress_bar_convert.setValue(50)
-                cv = Converter(self.selected_pdf)
-                cv.convert(save_path, start=0, end=None)
-                cv.close()
-                self.progress_bar_convert.setValue(100)
-
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = PDFScannerConverter()
-    window.show()
-    sys.exit(app.exec())
+import sys
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import math
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from PyQt6.QtWidgets import (QApplication, QWidget, QPushButton, QFileDialog, QVBoxLayout,
+                             QProgressBar, QLabel, QTabWidget, QComboBox)
+from PyQt6.QtGui import QPixmap
+from PyQt6.QtCore import QThread, pyqtSignal
+from pdf2docx import Converter
+from PIL import Image
+import numpy as np
+import pytesseract
+import fitz  # PyMuPDF, устанавливается вместе с pdf2docx
+
+# Сколько страниц обрабатывает одна задача пула при конвертации в DOCX;
+# чем меньше, тем чаще обновляется прогресс, но тем больше накладных расходов
+CONVERT_CHUNK_PAGES = 5
+
+# Параметры распознавания
+OCR_DPI = 300
+OCR_LANG = "rus+eng"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+OCR_TEXT_FONT = "china-s"
+
+# Кэш результатов распознавания
+OCR_CACHE_DB = os.path.join(os.path.expanduser("~"), ".cache", "scanpdfocr", "ocr_cache.db")
+OCR_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Меняется при изменении формата или расчёта рамок слов, чтобы не брать старые записи
+OCR_CACHE_VERSION = 2
+
+# Профили предобработки перед распознаванием:
+# target_dpi - до какого разрешения уменьшать (None - не уменьшать),
+# binarize - перевод в ч/б по порогу Оцу, deskew - выравнивание наклона (макс. угол в градусах),
+# crop - обрезка тёмных краёв скана и пустых полей
+PREPROCESS_PROFILES = {
+    "none": {"target_dpi": None, "binarize": False, "deskew": 0, "crop": False},
+    "fast": {"target_dpi": 200, "binarize": True, "deskew": 0, "crop": True},
+    "quality": {"target_dpi": 300, "binarize": True, "deskew": 5, "crop": True},
+}
+DEFAULT_PREPROCESS_PROFILE = "fast"
+
+class PDFScannerConverter(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.initUI()
+
+    def initUI(self):
+        self.setWindowTitle("Сканер и Конвертер PDF")
+        self.setGeometry(100, 100, 800, 600)
+
+        self.tabs = QTabWidget(self)
+
+        # Вкладка сканера
+        self.scan_tab = QWidget()
+        self.initScanTab()
+        self.tabs.addTab(self.scan_tab, "Сканировать")
+
+        # Вкладка конвертера
+        self.convert_tab = QWidget()
+        self.initConvertTab()
+        self.tabs.addTab(self.convert_tab, "Конвертер PDF")
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.tabs)
+        self.setLayout(layout)
+
+    def initScanTab(self):
+        layout = QVBoxLayout()
+
+        self.source_label = QLabel("Источник: Не выбрано")
+        layout.addWidget(self.source_label)
+
+        self.source_button = QPushButton("Выбрать скан (PDF или изображения)")
+        self.source_button.clicked.connect(self.select_scan_source)
+        layout.addWidget(self.source_button)
+
+        self.scan_button = QPushButton("Сканировать и сохранить")
+        self.scan_button.clicked.connect(self.scan_and_save)
+        layout.addWidget(self.scan_button)
+
+        self.save_path_label = QLabel("Путь сохранения: Не выбрано")
+        layout.addWidget(self.save_path_label)
+
+        self.save_path_button = QPushButton("Выбрать путь сохранения")
+        self.save_path_button.clicked.connect(self.select_save_path)
+        layout.addWidget(self.save_path_button)
+
+        self.format_label = QLabel("Формат сохранения:")
+        layout.addWidget(self.format_label)
+
+        self.format_combo = QComboBox()
+        self.format_combo.addItems(["PDF", "DOCX"])
+        layout.addWidget(self.format_combo)
+
+        self.profile_label = QLabel("Предобработка:")
+        layout.addWidget(self.profile_label)
+
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItems(list(PREPROCESS_PROFILES))
+        self.profile_combo.setCurrentText(DEFAULT_PREPROCESS_PROFILE)
+        layout.addWidget(self.profile_combo)
+
+        self.progress_bar = QProgressBar()
+        layout.addWidget(self.progress_bar)
+
+        self.scan_status_label = QLabel("")
+        layout.addWidget(self.scan_status_label)
+
+        self.scan_tab.setLayout(layout)
+
+    def initConvertTab(self):
+        layout = QVBoxLayout()
+
+        self.file_select_button = QPushButton("Выбрать PDF файл")
+        self.file_select_button.clicked.connect(self.select_pdf_file)
+        layout.addWidget(self.file_select_button)
+
+        self.convert_button = QPushButton("Конвертировать в DOCX")
+        self.convert_button.clicked.connect(self.convert_pdf_to_docx)
+        layout.addWidget(self.convert_button)
+
+        self.cancel_convert_button = QPushButton("Отменить")
+        self.cancel_convert_button.setEnabled(False)
+        self.cancel_convert_button.clicked.connect(self.cancel_conversion)
+        layout.addWidget(self.cancel_convert_button)
+
+        self.progress_bar_convert = QProgressBar()
+        layout.addWidget(self.progress_bar_convert)
+
+        self.convert_status_label = QLabel("")
+        layout.addWidget(self.convert_status_label)
+
+        self.convert_tab.setLayout(layout)
+
+    def select_save_path(self):
+        folder = QFileDialog.getExistingDirectory(self, "Выбрать папку для сохранения")
+        if folder:
+            self.save_path_label.setText(f"Путь сохранения: {folder}")
+            self.save_path = folder
+
+    def select_scan_source(self):
+        files, _ = QFileDialog.getOpenFileNames(
+            self, "Выбрать скан", "",
+            "PDF и изображения (*.pdf " + " ".join(f"*{ext}" for ext in IMAGE_EXTENSIONS) + ")")
+        if files:
+            # Один PDF распознаётся постранично, набор изображений - по файлу на страницу
+            self.scan_source = files[0] if len(files) == 1 and files[0].lower().endswith(".pdf") else sorted(files)
+            self.source_label.setText(f"Источник: {files[0]}" if len(files) == 1 else f"Источник: {len(files)} изображений")
+
+    def scan_and_save(self):
+        if not hasattr(self, 'scan_source'):
+            self.scan_status_label.setText("Выберите скан!")
+            return
+
+        format_selected = self.format_combo.currentText()
+        save_path = self.save_path if hasattr(self, 'save_path') else os.getcwd()
+        output_file = os.path.join(save_path, f"scan_result.{format_selected.lower()}")
+
+        self.progress_bar.setValue(0)
+        self.scan_button.setEnabled(False)
+        self.scan_worker = OCRWorker(self.scan_source, output_file, self.profile_combo.currentText())
+        self.scan_worker.progress.connect(self.on_scan_progress)
+        self.scan_worker.done.connect(self.on_scan_done)
+        self.scan_worker.start()
+
+    def on_scan_progress(self, done, total, pages_per_sec):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+        self.scan_status_label.setText(f"Распознано {done} из {total} ({pages_per_sec:.2f} стр./с)")
+
+    def on_scan_done(self, message):
+        self.scan_button.setEnabled(True)
+        self.scan_status_label.setText(message)
+
+    def select_pdf_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Выбрать PDF файл", "", "PDF Files (*.pdf)")
+        if file_path:
+            self.selected_pdf = file_path
+
+    def convert_pdf_to_docx(self):
+        if hasattr(self, 'selected_pdf'):
+            save_path, _ = QFileDialog.getSaveFileName(self, "Сохранить DOCX", "", "Word Document (*.docx)")
+            if save_path:
+                self.progress_bar_convert.setValue(0)
+                self.convert_button.setEnabled(False)
+                self.cancel_convert_button.setEnabled(True)
+
+                self.convert_worker = ConvertWorker(self.selected_pdf, save_path)
+                self.convert_worker.progress.connect(self.on_convert_progress)
+                self.convert_worker.done.connect(self.on_convert_done)
+                self.convert_worker.start()
+
+    def cancel_conversion(self):
+        if hasattr(self, 'convert_worker'):
+            self.convert_worker.cancel()
+            self.convert_status_label.setText("Отмена...")
+
+    def on_convert_progress(self, done, total, stage):
+        self.progress_bar_convert.setRange(0, total)
+        self.progress_bar_convert.setValue(done)
+        self.convert_status_label.setText(f"{stage}: {done} из {total}")
+
+    def on_convert_done(self, message):
+        self.convert_button.setEnabled(True)
+        self.cancel_convert_button.setEnabled(False)
+        self.convert_status_label.setText(message)
+
+
+class ConvertWorker(QThread):
+    """Конвертирует PDF в DOCX в фоновом потоке и сообщает о прогрессе по страницам."""
+    progress = pyqtSignal(int, int, str)
+    done = pyqtSignal(str)
+
+    def __init__(self, pdf_path, docx_path):
+        super().__init__()
+        self.pdf_path = pdf_path
+        self.docx_path = docx_path
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            elapsed = convert_pdf_file_to_docx(self.pdf_path, self.docx_path,
+                                               progress=self.progress.emit, cancel_event=self.cancel_event)
+            self.done.emit(f"Готово за {elapsed:.1f} с: {self.docx_path}")
+        except ConversionCancelled:
+            self.done.emit("Конвертация отменена")
+        except Exception as e:
+            self.done.emit(f"Ошибка: {e}")
+
+
+class OCRWorker(QThread):
+    """Распознаёт скан в фоновом потоке."""
+    progress = pyqtSignal(int, int, float)
+    done = pyqtSignal(str)
+
+    def __init__(self, source, output_file, profile=DEFAULT_PREPROCESS_PROFILE):
+        super().__init__()
+        self.source = source
+        self.output_file = output_file
+        self.profile = profile
+
+    def run(self):
+        try:
+            pages, elapsed, cache_hits, stage_ms = ocr_to_file(self.source, self.output_file, profile=self.profile,
+                                                               progress=self.progress.emit)
+            ocr_pages = max(pages - cache_hits, 1)
+            stages = ", ".join(f"{stage} {ms / ocr_pages:.0f}" for stage, ms in stage_ms.items())
+            self.done.emit(f"Готово: {pages} стр. за {elapsed:.1f} с ({pages / max(elapsed, 1e-9):.2f} стр./с, "
+                           f"из кэша {cache_hits}), {self.output_file}\nмс/стр.: {stages}")
+        except Exception as e:
+            self.done.emit(f"Ошибка: {e}")
+
+
+class ConversionCancelled(Exception):
+    pass
+
+
+def _source_page_count(source):
+    if isinstance(source, str) and source.lower().endswith(".pdf"):
+        with fitz.open(source) as doc:
+            return len(doc)
+    return len(_source_image_paths(source))
+
+
+def _source_image_paths(source):
+    if isinstance(source, str):
+        return sorted(entry.path for entry in os.scandir(source)
+                      if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS))
+    return list(source)
+
+
+def iter_source_pages(source, dpi=OCR_DPI):
+    """Выдаёт страницы источника как (режим, размер, байты пикселей, dpi) для передачи в процессы.
+
+    source - путь к PDF, папка с изображениями или список путей к изображениям.
+    Страницы PDF рендерятся в оттенках серого, чтобы не гонять лишние каналы между процессами.
+    """
+    if isinstance(source, str) and source.lower().endswith(".pdf"):
+        with fitz.open(source) as doc:
+            for page in doc:
+                pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+                yield "L", (pix.width, pix.height), pix.samples, dpi
+    else:
+        for path in _source_image_paths(source):
+            with Image.open(path) as image:
+                image_dpi = image.info.get("dpi", (dpi, dpi))[0] or dpi
+                if image.mode not in ("L", "RGB"):
+                    image = image.convert("RGB")
+                yield image.mode, image.size, image.tobytes(), image_dpi
+
+
+class OCRCache:
+    """Кэш результатов распознавания в SQLite.
+
+    Ключ - SHA-256 пикселей страницы вместе с языком и настройками Tesseract,
+    поэтому страница находится в кэше независимо от её номера и документа.
+    Хранятся текст и рамки слов. При превышении max_bytes удаляются записи,
+    которые дольше всего не использовались.
+    """
+
+    def __init__(self, path=OCR_CACHE_DB, max_bytes=OCR_CACHE_MAX_BYTES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS pages (
+            key TEXT PRIMARY KEY,
+            text TEXT,
+            words TEXT,
+            size INTEGER,
+            used REAL
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_used ON pages (used)")
+
+    @staticmethod
+    def key(mode, size, pixels, lang, config):
+        digest = hashlib.sha256(f"v{OCR_CACHE_VERSION}|{lang}|{config}|{mode}|{size[0]}x{size[1]}|".encode("utf-8"))
+        digest.update(pixels)
+        return digest.hexdigest()
+
+    def get(self, key):
+        row = self.conn.execute("SELECT text, words FROM pages WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE pages SET used = ? WHERE key = ?", (time.time(), key))
+        return {"text": row[0], "words": json.loads(row[1])}
+
+    def put(self, key, result):
+        words = json.dumps(result["words"], ensure_ascii=False)
+        self.conn.execute("INSERT OR REPLACE INTO pages (key, text, words, size, used) VALUES (?, ?, ?, ?, ?)",
+                          (key, result["text"], words, len(result["text"]) + len(words), time.time()))
+
+    def evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM pages ORDER BY used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+            total -= size
+
+    def close(self):
+        self.evict()
+        self.conn.commit()
+        self.conn.close()
+
+
+def _otsu_threshold(pixels):
+    """Порог Оцу по гистограмме яркостей, без циклов по пикселям."""
+    hist = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    sum_bg = np.cumsum(hist * levels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_bg[-1] - sum_bg) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.nanargmax(variance))
+
+
+def _skew_angle(pixels, max_angle, step=0.5, thumb_width=600):
+    """Угол наклона текста по проекции строк на уменьшенной копии.
+
+    Для каждого угла копия поворачивается, и берётся угол, при котором профиль
+    сумм тёмных пикселей по строкам самый контрастный (строки текста ровные).
+    """
+    image = Image.fromarray(pixels)
+    if image.width > thumb_width:
+        image = image.resize((thumb_width, max(1, image.height * thumb_width // image.width)), Image.BOX)
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-max_angle, max_angle + step / 2, step):
+        rotated = np.asarray(image.rotate(angle, resample=Image.NEAREST, fillcolor=255))
+        profile = (rotated < 128).sum(axis=1).astype(np.float64)
+        score = np.square(np.diff(profile)).sum()
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def _edge_run(fractions, limit=0.3):
+    """Длина серии строк (или столбцов) от края, в которых доля тёмных пикселей не меньше limit."""
+    below = fractions < limit
+    return int(np.argmax(below)) if below.any() else len(fractions)
+
+
+def _content_box(ink, pad=10, min_fraction=0.002):
+    """Рамка содержимого (top, bottom, left, right) по маске тёмных пикселей или None.
+
+    Сначала с каждого края отрезаются почти целиком тёмные полосы (тень от
+    крышки сканера), затем внутри ищутся строки и столбцы, где тёмных пикселей
+    больше min_fraction - одиночные точки шума рамку не расширяют.
+    """
+    row_fractions = ink.mean(axis=1)
+    col_fractions = ink.mean(axis=0)
+    top = _edge_run(row_fractions)
+    bottom = len(row_fractions) - _edge_run(row_fractions[::-1])
+    left = _edge_run(col_fractions)
+    right = len(col_fractions) - _edge_run(col_fractions[::-1])
+    if top >= bottom or left >= right:
+        return None
+
+    # Полосы у края немного шире найденных из-за сглаживания при масштабировании
+    top, bottom, left, right = top + 2, bottom - 2, left + 2, right - 2
+    inner = ink[top:bottom, left:right]
+    rows = np.flatnonzero(inner.mean(axis=1) > min_fraction)
+    cols = np.flatnonzero(inner.mean(axis=0) > min_fraction)
+    if not rows.size or not cols.size:
+        return None
+    return (max(top + rows[0] - pad, 0), min(top + rows[-1] + 1 + pad, ink.shape[0]),
+            max(left + cols[0] - pad, 0), min(left + cols[-1] + 1 + pad, ink.shape[1]))
+
+
+def preprocess_image(image, dpi, profile=DEFAULT_PREPROCESS_PROFILE):
+    """Готовит страницу к распознаванию согласно профилю из PREPROCESS_PROFILES.
+
+    Возвращает (изображение, преобразование, время этапов в мс). Преобразование
+    (масштаб, обрезка x, обрезка y, угол, центр x, центр y) нужно, чтобы вернуть
+    рамки слов в координаты исходного изображения (см. _to_source): обрезка и
+    центр поворота заданы в пикселях уменьшенного изображения.
+    """
+    settings = PREPROCESS_PROFILES[profile]
+    timings = {}
+    stage_start = time.perf_counter()
+
+    def mark(stage):
+        nonlocal stage_start
+        now = time.perf_counter()
+        timings[stage] = (now - stage_start) * 1000
+        stage_start = now
+
+    scale, crop_x, crop_y, angle = 1.0, 0, 0, 0.0
+    if image.mode != "L":
+        image = image.convert("L")
+
+    target_dpi = settings["target_dpi"]
+    if target_dpi and dpi > target_dpi:
+        factor = target_dpi / dpi
+        image = image.resize((max(1, round(image.width * factor)), max(1, round(image.height * factor))), Image.BOX)
+        scale = 1 / factor
+        mark("resize")
+    pixels = np.asarray(image)
+    centre_x, centre_y = pixels.shape[1] / 2, pixels.shape[0] / 2
+
+    if settings["binarize"]:
+        pixels = np.where(pixels > _otsu_threshold(pixels), 255, 0).astype(np.uint8)
+        mark("binarize")
+
+    if settings["deskew"]:
+        angle = float(_skew_angle(pixels, settings["deskew"]))
+        if angle:
+            pixels = np.asarray(Image.fromarray(pixels).rotate(angle, resample=Image.BILINEAR, fillcolor=255))
+        mark("deskew")
+
+    if settings["crop"]:
+        crop = _content_box(pixels < 128)
+        if crop:
+            top, bottom, left, right = crop
+            pixels = pixels[top:bottom, left:right]
+            crop_x, crop_y = left, top
+        mark("crop")
+
+    return Image.fromarray(pixels), (scale, crop_x, crop_y, angle, centre_x, centre_y), timings
+
+
+def _to_source(x, y, transform):
+    """Точка обработанного изображения -> точка исходного: обрезка, поворот и масштаб в обратном порядке."""
+    scale, crop_x, crop_y, angle, centre_x, centre_y = transform
+    x, y = x + crop_x - centre_x, y + crop_y - centre_y
+    if angle:
+        # Image.rotate(angle) поворачивает против часовой стрелки вокруг центра; здесь обратный поворот
+        cos, sin = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+        x, y = x * cos - y * sin, x * sin + y * cos
+    return (x + centre_x) * scale, (y + centre_y) * scale
+
+
+def _ocr_page(mode, size, pixels, lang, config, dpi=OCR_DPI, profile=DEFAULT_PREPROCESS_PROFILE):
+    """Распознаёт одну страницу в процессе пула.
+
+    Возвращает {"text": текст, "words": [[left, top, width, height, слово], ...]},
+    координаты в пикселях исходного изображения, и время этапов в мс.
+    """
+    image, transform, timings = preprocess_image(Image.frombytes(mode, size, pixels), dpi, profile)
+    ocr_start = time.perf_counter()
+    data = pytesseract.image_to_data(image, lang=lang, config=config, output_type=pytesseract.Output.DICT)
+    timings["ocr"] = (time.perf_counter() - ocr_start) * 1000
+
+    words = []
+    lines = {}
+    for i, word in enumerate(data["text"]):
+        word = word.strip()
+        if not word or float(data["conf"][i]) < 0:
+            continue
+        # После поворота рамка наклонена; берём описанный вокруг её углов прямоугольник
+        left, top = data["left"][i], data["top"][i]
+        right, bottom = left + data["width"][i], top + data["height"][i]
+        corners = [_to_source(x, y, transform) for x, y in ((left, top), (right, top), (left, bottom), (right, bottom))]
+        xs, ys = [x for x, _ in corners], [y for _, y in corners]
+        words.append([min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys), word])
+        lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), []).append(word)
+
+    # Строки абзаца через перевод строки, абзацы - через пустую строку
+    paragraphs = {}
+    for (block, par, _), line_words in lines.items():
+        paragraphs.setdefault((block, par), []).append(" ".join(line_words))
+    text = "\n\n".join("\n".join(paragraph) for paragraph in paragraphs.values())
+    return {"text": text, "words": words}, timings
+
+
+def _add_searchable_page(output, page_image, result):
+    """Добавляет в PDF страницу с изображением скана и невидимым текстовым слоем по рамкам слов."""
+    mode, size, pixels, dpi = page_image
+    scale = 72 / dpi
+    page = output.new_page(width=size[0] * scale, height=size[1] * scale)
+    colorspace = fitz.csGRAY if mode == "L" else fitz.csRGB
+    page.insert_image(page.rect, pixmap=fitz.Pixmap(colorspace, size[0], size[1], pixels, False))
+
+    # Текстовый слой невидим, поэтому шрифт нужен только с полным Unicode (кириллица),
+    # встроенный в MuPDF и не встраиваемый в файл
+    font = fitz.Font(OCR_TEXT_FONT)
+    for left, top, width, height, word in result["words"]:
+        fontsize = height * scale
+        text_length = font.text_length(word, fontsize=1)
+        if text_length:
+            fontsize = min(fontsize, width * scale / text_length)
+        page.insert_text((left * scale, (top + height) * scale), word, fontsize=fontsize,
+                         fontname=OCR_TEXT_FONT, render_mode=3)
+
+
+def ocr_to_file(source, output_file, fmt=None, lang=OCR_LANG, config="", workers=None, dpi=OCR_DPI,
+                progress=None, cache_path=OCR_CACHE_DB, profile=DEFAULT_PREPROCESS_PROFILE):
+    """Распознаёт скан в searchable PDF или DOCX.
+
+    Страницы рендерятся в текущем процессе. Страницы, которые уже есть в кэше
+    OCRCache, не передаются в Tesseract; остальные распознаются в пуле процессов.
+    Одновременно в работе не больше двух страниц на процесс, поэтому память не
+    растёт с размером документа. Результаты собираются в порядке страниц по мере
+    готовности; progress(done, total, pages_per_sec) вызывается после каждой
+    страницы. cache_path=None отключает кэш. Перед распознаванием страницы
+    проходят preprocess_image с профилем profile. Возвращает (число страниц,
+    время в секундах, число страниц из кэша, суммарное время этапов в мс).
+    """
+    fmt = (fmt or os.path.splitext(output_file)[1][1:]).upper()
+    if fmt not in ("PDF", "DOCX"):
+        raise ValueError(f"Неизвестный формат: {fmt}")
+
+    total = _source_page_count(source)
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2
+
+    if fmt == "PDF":
+        output = fitz.open()
+
+        def append(page_image, result):
+            _add_searchable_page(output, page_image, result)
+    else:
+        from docx import Document
+        from docx.enum.text import WD_BREAK
+        output = Document()
+
+        def append(page_image, result):
+            if len(output.paragraphs):
+                output.paragraphs[-1].add_run().add_break(WD_BREAK.PAGE)
+            output.add_paragraph(result["text"])
+
+    cache = OCRCache(cache_path) if cache_path else None
+    start = time.perf_counter()
+    results = {}
+    pending = {}
+    next_index = 0
+    cache_hits = 0
+    stage_ms = {}
+
+    def collect(done):
+        nonlocal next_index
+        for future in done:
+            index, key, page_image = pending.pop(future)
+            result, timings = future.result()
+            for stage, ms in timings.items():
+                stage_ms[stage] = stage_ms.get(stage, 0.0) + ms
+            if cache:
+                cache.put(key, result)
+            results[index] = (page_image, result)
+        # Страницы добавляются строго по порядку, вышедшие вперёд ждут в results
+        while next_index in results:
+            append(*results.pop(next_index))
+            next_index += 1
+            if progress:
+                progress(next_index, total, next_index / max(time.perf_counter() - start, 1e-9))
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for index, page_image in enumerate(iter_source_pages(source, dpi)):
+                mode, size, pixels, page_dpi = page_image
+                # Пиксели нужны при сборке только для PDF
+                kept_image = page_image if fmt == "PDF" else None
+                key = OCRCache.key(mode, size, pixels, lang, f"{config}|{profile}") if cache else None
+                result = cache.get(key) if cache else None
+
+                if result is not None:
+                    cache_hits += 1
+                    results[index] = (kept_image, result)
+                    collect(())
+                else:
+                    future = pool.submit(_ocr_page, mode, size, pixels, lang, config, page_dpi, profile)
+                    pending[future] = (index, key, kept_image)
+
+                while pending and len(pending) + len(results) >= max_in_flight:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(list(pending))
+    finally:
+        if cache:
+            cache.close()
+
+    output.save(output_file)
+    if fmt == "PDF":
+        output.close()
+    return next_index, time.perf_counter() - start, cache_hits, stage_ms
+
+
+# Текст синтетических страниц для проверки предобработки
+BENCHMARK_OCR_TEXT = [
+    "Съешь же ещё этих мягких французских булок, да выпей чаю.",
+    "The quick brown fox jumps over the lazy dog 0123456789.",
+    "Широкая электрификация южных губерний даст мощный толчок.",
+    "Pack my box with five dozen liquor jugs.",
+]
+
+
+def _make_ocr_fixture(page_number, dpi=OCR_DPI, seed=0):
+    """Синтетический «скан»: текст, наклон, шум и тёмная рамка. Возвращает (изображение, эталонный текст).
+
+    Генерация детерминирована (seed), поэтому набор страниц одинаков при каждом запуске.
+    """
+    lines = [BENCHMARK_OCR_TEXT[(page_number + i) % len(BENCHMARK_OCR_TEXT)] for i in range(12)]
+    doc = fitz.open()
+    page = doc.new_page()
+    for i, line in enumerate(lines):
+        page.insert_text((50, 80 + i * 30), line, fontsize=8, fontname=OCR_TEXT_FONT)
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    doc.close()
+
+    rng = np.random.default_rng(seed + page_number)
+    image = image.rotate(rng.uniform(-2, 2), resample=Image.BILINEAR, fillcolor=255)
+    pixels = np.asarray(image, dtype=np.int16) + rng.normal(0, 25, (image.height, image.width)).astype(np.int16)
+    pixels = np.clip(pixels, 0, 255).astype(np.uint8)
+    border = dpi // 8
+    pixels[:border, :] = pixels[-border:, :] = 20
+    pixels[:, :border] = pixels[:, -border:] = 20
+    return Image.fromarray(pixels), "\n".join(lines)
+
+
+def benchmark_preprocessing(pages=5, lang=OCR_LANG):
+    """Сравнивает профили предобработки по времени на страницу и точности распознавания.
+
+    Точность - доля совпадающих символов (difflib) между распознанным и эталонным текстом.
+    """
+    from difflib import SequenceMatcher
+
+    fixtures = [_make_ocr_fixture(i) for i in range(pages)]
+    for profile in PREPROCESS_PROFILES:
+        stage_ms = {}
+        accuracy = 0.0
+        for image, truth in fixtures:
+            result, timings = _ocr_page(image.mode, image.size, image.tobytes(), lang, "", OCR_DPI, profile)
+            for stage, ms in timings.items():
+                stage_ms[stage] = stage_ms.get(stage, 0.0) + ms
+            accuracy += SequenceMatcher(None, " ".join(result["text"].split()), " ".join(truth.split())).ratio()
+        total_ms = sum(stage_ms.values()) / pages
+        stages = ", ".join(f"{stage} {ms / pages:.0f}" for stage, ms in stage_ms.items())
+        print(f"{profile:>8}: {total_ms:.0f} мс/стр. ({stages}), точность {accuracy / pages:.3f}")
+
+
+def _parse_page_chunk(pdf_path, page_indexes, settings):
+    """Разбирает часть страниц PDF в отдельном процессе и возвращает результат Converter.store()."""
+    cv = Converter(pdf_path)
+    try:
+        cv.load_pages()
+        for page in cv.pages:
+            page.skip_parsing = True
+        for i in page_indexes:
+            cv.pages[i].skip_parsing = False
+        return cv.parse_document(**settings).parse_pages(**settings).store()
+    finally:
+        cv.close()
+
+
+def convert_pdf_file_to_docx(pdf_path, docx_path, workers=None, chunk_pages=CONVERT_CHUNK_PAGES,
+                             progress=None, cancel_event=None, **kwargs):
+    """Конвертирует PDF в DOCX, разбирая страницы частями в пуле процессов.
+
+    Так же устроен встроенный multi_processing в pdf2docx, но части здесь
+    мелкие и результат возвращается из процесса напрямую, поэтому можно
+    сообщать о прогрессе progress(done, total, stage) по мере готовности
+    страниц и отменить конвертацию через cancel_event (threading.Event) -
+    ещё не начатые части снимаются с очереди. workers=1 - разбор в текущем
+    процессе. Возвращает время работы в секундах.
+    """
+    start = time.perf_counter()
+    cv = Converter(pdf_path)
+    try:
+        settings = cv.default_settings
+        settings.update(kwargs)
+
+        page_count = len(cv.fitz_doc)
+        chunks = [list(range(i, min(i + chunk_pages, page_count))) for i in range(0, page_count, chunk_pages)]
+        workers = min(workers or os.cpu_count() or 1, len(chunks))
+
+        def check_cancelled():
+            if cancel_event is not None and cancel_event.is_set():
+                raise ConversionCancelled()
+
+        def report(done, stage):
+            if progress:
+                progress(done, page_count, stage)
+
+        parsed = 0
+        report(parsed, "Разбор страниц")
+        if workers <= 1:
+            for chunk in chunks:
+                check_cancelled()
+                cv.restore(_parse_page_chunk(pdf_path, chunk, settings))
+                parsed += len(chunk)
+                report(parsed, "Разбор страниц")
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(_parse_page_chunk, pdf_path, chunk, settings): chunk for chunk in chunks}
+                try:
+                    for future in as_completed(futures):
+                        check_cancelled()
+                        cv.restore(future.result())
+                        parsed += len(futures[future])
+                        report(parsed, "Разбор страниц")
+                except BaseException:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+
+        check_cancelled()
+        report(0, "Создание DOCX")
+        cv.make_docx(docx_path, **settings)
+        report(page_count, "Создание DOCX")
+    finally:
+        cv.close()
+    return time.perf_counter() - start
+
+
+def _make_benchmark_pdf(path, pages):
+    """Синтетический PDF с абзацами текста и таблицей на каждой странице."""
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        text = f"Страница {page_number + 1}. " + "Пример текста для конвертации. " * 40
+        page.insert_textbox(fitz.Rect(50, 50, 545, 400), text, fontsize=11)
+        for row in range(5):
+            for col in range(4):
+                rect = fitz.Rect(50 + col * 120, 450 + row * 25, 170 + col * 120, 475 + row * 25)
+                page.draw_rect(rect, color=(0, 0, 0))
+                page.insert_textbox(rect + (3, 3, -3, -3), f"{row}:{col}", fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def benchmark_conversion(pdf_path=None, pages=200, workers=None):
+    """Сравнивает конвертацию в одном процессе и в пуле процессов."""
+    with tempfile.TemporaryDirectory() as tmp:
+        if pdf_path is None:
+            pdf_path = os.path.join(tmp, "bench.pdf")
+            _make_benchmark_pdf(pdf_path, pages)
+        single = convert_pdf_file_to_docx(pdf_path, os.path.join(tmp, "single.docx"), workers=1)
+        pooled = convert_pdf_file_to_docx(pdf_path, os.path.join(tmp, "pool.docx"), workers=workers)
+    print(f"Один процесс: {single:.2f} с")
+    print(f"Пул процессов ({workers or os.cpu_count()}): {pooled:.2f} с, ускорение x{single / pooled:.2f}")
+    return single, pooled
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--bench":
+        benchmark_conversion(sys.argv[2] if len(sys.argv) > 2 else None)
+        sys.exit()
+    if len(sys.argv) == 2 and sys.argv[1] == "--bench-ocr":
+        benchmark_preprocessing()
+        sys.exit()
+
+    app = QApplication(sys.argv)
+    window = PDFScannerConverter()
+    window.show()
+    sys.exit(app.exec())
@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import pdftodocx
+
+
+class _GitHubStub(BaseHTTPRequestHandler):
+    """Заглушка GitHub API: постраничный GET /user/repos и POST /user/repos."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        stub = self.server
+        page = int(parse_qs(urlparse(self.path).query).get("page", ["1"])[0])
+        stub.pages.append(page)
+        names = stub.repos[(page - 1) * 100:page * 100]
+        headers = []
+        if page * 100 < len(stub.repos):
+            headers.append(("Link", f'<{stub.url}/user/repos?per_page=100&page={page + 1}>; rel="next"'))
+        self._reply(200, [{"name": name} for name in names], headers)
+
+    def do_POST(self):
+        stub = self.server
+        name = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["name"]
+        with stub.lock:
+            limited = stub.limits.pop(name, None)
+            stub.active += 1
+            stub.max_active = max(stub.max_active, stub.active)
+        try:
+            if limited is not None:
+                self._reply(limited[0], {"message": "rate limited"}, limited[1])
+                return
+            time.sleep(0.05)
+            with stub.lock:
+                stub.created.append(name)
+            self._reply(201, {"name": name})
+        finally:
+            with stub.lock:
+                stub.active -= 1
+
+
+@pytest.fixture
+def github():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GitHubStub)
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.lock = threading.Lock()
+    server.repos, server.pages, server.created, server.limits = [], [], [], {}
+    server.active = server.max_active = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(github):
+    sleeps = []
+    with pdftodocx.GitHubClient(token="test", username="tester", api_url=github.url, sleep=sleeps.append) as client:
+        client.sleeps = sleeps
+        yield client
+
+
+def test_list_repo_names_follows_pages(github, client):
+    github.repos = [f"Repo-{i}" for i in range(250)]
+
+    assert client.list_repo_names() == {f"repo-{i}" for i in range(250)}
+    assert github.pages == [1, 2, 3]
+    github.pages.clear()
+    assert client.repo_exists("REPO-249") and not client.repo_exists("repo-250")
+    assert github.pages == [1, 2, 3]
+
+
+def test_create_repos_runs_concurrently(github, client):
+    names = [f"project-{i}" for i in range(8)]
+
+    assert client.create_repos(names + names[:2]) == dict.fromkeys(names, True)
+    assert sorted(github.created) == sorted(names)
+    assert github.max_active > 1
+
+
+@pytest.mark.parametrize("status, headers, low, high", [
+    (429, [("Retry-After", "7")], 6, 7),
+    (429, [("Retry-After", formatdate(time.time() + 30, usegmt=True))], 25, 30),
+    (403, [("Retry-After", "soon"), ("X-RateLimit-Remaining", "0"),
+           ("X-RateLimit-Reset", str(int(time.time()) + 20))], 15, 21),
+])
+def test_rate_limited_request_waits_and_retries(github, client, status, headers, low, high):
+    github.limits["limited"] = (status, headers)
+
+    assert client.create_repo("limited")
+    assert github.created == ["limited"]
+    assert len(client.sleeps) == 1 and low <= client.sleeps[0] <= high
+
+
+@pytest.fixture
+def state(tmp_path):
+    with pdftodocx.ProjectState(str(tmp_path / "state.db")) as state:
+        yield state
+    pdftodocx.close_backup_stores()
+
+
+def test_extensionless_script_moves_into_its_own_project_folder(tmp_path, state, monkeypatch):
+    base = tmp_path / "base"
+    base.mkdir()
+    (base / "run").write_bytes(b"#!/bin/sh\necho run\n")
+    (base / "run.py").write_text("print('run')\n")
+    (base / "notes").write_text("просто текст\n")
+    (base / "notes.py").write_text("print('notes')\n")
+    synced = []
+    monkeypatch.setattr(pdftodocx, "sync_github_repos", lambda projects, **kwargs: synced.append(dict(projects)))
+
+    plan = {item.name: item for item in pdftodocx.organize_scripts(str(base), state)}
+
+    assert plan["run"].move_aside and not plan["run"].conflict
+    assert (base / "run" / "scripts" / "run").read_bytes().startswith(b"#!")
+    assert (base / "run" / "scripts" / "run.py").is_file()
+    assert sorted(p.name for p in base.iterdir()) == ["Backup", "notes", "notes.py", "run"]
+    assert plan["notes.py"].project_dir is None and plan["notes.py"].conflict
+    assert state.has_project("run") and not state.has_project("notes")
+    assert set(synced[0]) == {"run"}
+
+
+def test_recursive_plan_skips_project_folders(tmp_path, state):
+    base = tmp_path / "base"
+    for folder in ("old/scripts", "old/data", "nested/deep/scripts", "loose"):
+        (base / folder).mkdir(parents=True)
+    (base / "old" / "scripts" / "old.py").write_text("")
+    (base / "nested" / "deep" / "scripts" / "deep.py").write_text("")
+    (base / "loose" / "loose.py").write_text("")
+
+    plan = pdftodocx.plan_organization(str(base), state, recursive=True)
+
+    assert [(item.name, item.target) for item in plan] == [("loose.py", str(base / "loose" / "scripts" / "loose.py"))]
+
+
+def test_readonly_state_leaves_database_untouched(tmp_path):
+    path = str(tmp_path / "state.db")
+    with pdftodocx.ProjectState(path) as state:
+        state.add_project("old", "/old", "old")
+    before = (sorted(p.name for p in tmp_path.iterdir()), (tmp_path / "state.db").read_bytes())
+
+    with pdftodocx.ProjectState(path, readonly=True) as state:
+        assert state.has_project("old")
+        state.add_project("new", "/new", "new")
+        assert state.has_project("new")
+    with pdftodocx.ProjectState(str(tmp_path / "missing.db"), readonly=True) as state:
+        assert not state.has_project("old")
+
+    assert (sorted(p.name for p in tmp_path.iterdir()), (tmp_path / "state.db").read_bytes()) == before
@@ -0,0 +1,27 @@
+import pytest
+
+import plantsdate
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(plantsdate, "DB_PATH", str(tmp_path / "plants.db"))
+    monkeypatch.setattr(plantsdate, "_connection", None)
+    monkeypatch.setattr(plantsdate, "_stage_durations", None)
+    plantsdate.setup_database()
+    yield plantsdate.get_connection()
+    plantsdate.get_connection().close()
+
+
+def test_null_durations_count_as_zero(database):
+    database.execute("INSERT INTO plants (name, seedling_days, vegetation_days, flowering_days, fruiting_days) "
+                     "VALUES ('Томат', 10, NULL, 5, NULL)")
+    database.commit()
+    plantsdate.set_planting_date("Томат", "2026-04-01")
+
+    assert plantsdate.recompute_dirty_plantings() == 1
+    stages = ("2026-04-11", "2026-04-11", "2026-04-16", "2026-04-16")
+    assert plantsdate.fetch_plantings(["Томат"]) == {"Томат": ("2026-04-01", stages)}
+
+    schedule = plantsdate.plan_season(["Томат"], ["2026-04-01"])
+    assert [str(schedule[stage][0]) for stage in plantsdate.STAGES] == list(stages)
@@ -0,0 +1,80 @@
+import math
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+import scanpdfocr1
+
+
+WIDTH, HEIGHT, DPI, SKEW = 1600, 2000, 600, -3.0
+
+
+def _layout():
+    """Прямоугольники "слов" ровной страницы: (left, top, right, bottom)."""
+    words = []
+    for line in range(20):
+        top = 200 + line * 70
+        left = 200
+        for word in range(6):
+            width = 80 + (line * 7 + word * 13) % 90
+            words.append((left, top, left + width, top + 24))
+            left += width + 40
+    return words
+
+
+def _skewed(x, y):
+    """Куда точка ровной страницы попадает после Image.rotate(SKEW) вокруг центра."""
+    t = math.radians(SKEW)
+    dx, dy = x - WIDTH / 2, y - HEIGHT / 2
+    return WIDTH / 2 + dx * math.cos(t) + dy * math.sin(t), HEIGHT / 2 - dx * math.sin(t) + dy * math.cos(t)
+
+
+def _fake_image_to_data(image, lang=None, config=None, output_type=None):
+    """Вместо Tesseract: слова - группы тёмных столбцов внутри полос строк."""
+    ink = np.asarray(image) < 128
+    data = {key: [] for key in ("text", "conf", "left", "top", "width", "height", "block_num", "par_num", "line_num")}
+    rows = np.flatnonzero(ink.sum(axis=1) > 0)
+    bands = np.split(rows, np.flatnonzero(np.diff(rows) > 1) + 1) if rows.size else []
+    for line, band in enumerate(bands):
+        top, bottom = band[0], band[-1] + 1
+        columns = np.flatnonzero(ink[top:bottom].any(axis=0))
+        for segment in np.split(columns, np.flatnonzero(np.diff(columns) > 10) + 1):
+            left, right = segment[0], segment[-1] + 1
+            for key, value in (("text", "слово"), ("conf", 90), ("left", int(left)), ("top", int(top)),
+                               ("width", int(right - left)), ("height", int(bottom - top)),
+                               ("block_num", 1), ("par_num", 1), ("line_num", line)):
+                data[key].append(value)
+    return data
+
+
+def test_quality_profile_maps_word_boxes_back_to_skewed_page(monkeypatch):
+    page = Image.new("L", (WIDTH, HEIGHT), 255)
+    draw = ImageDraw.Draw(page)
+    layout = _layout()
+    for box in layout:
+        draw.rectangle((box[0], box[1], box[2] - 1, box[3] - 1), fill=0)
+    page = page.rotate(SKEW, resample=Image.BILINEAR, fillcolor=255)
+    monkeypatch.setattr(scanpdfocr1.pytesseract, "image_to_data", _fake_image_to_data)
+
+    result, _ = scanpdfocr1._ocr_page(page.mode, page.size, page.tobytes(), "rus", "", DPI, "quality")
+
+    found = [(left + width / 2, top + height / 2) for left, top, width, height, _ in result["words"]]
+    expected = [_skewed((left + right) / 2, (top + bottom) / 2) for left, top, right, bottom in layout]
+    assert len(found) == len(expected)
+    for x, y in expected:
+        distance = min(math.hypot(x - fx, y - fy) for fx, fy in found)
+        assert distance < 6, (x, y, distance)
+
+
+@pytest.mark.parametrize("profile", ["none", "fast"])
+def test_profiles_without_deskew_keep_box_positions(monkeypatch, profile):
+    page = Image.new("L", (WIDTH, HEIGHT), 255)
+    ImageDraw.Draw(page).rectangle((400, 300, 599, 339), fill=0)
+    monkeypatch.setattr(scanpdfocr1.pytesseract, "image_to_data", _fake_image_to_data)
+
+    result, _ = scanpdfocr1._ocr_page(page.mode, page.size, page.tobytes(), "rus", "", DPI, profile)
+
+    (left, top, width, height, _), = result["words"]
+    assert left == pytest.approx(400, abs=2) and top == pytest.approx(300, abs=2)
+    assert width == pytest.approx(200, abs=3) and height == pytest.approx(40, abs=3)